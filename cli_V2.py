@@ -1,7 +1,7 @@
 import argparse
 import sys
-import pandas as pd
 from demand_forecaster.forecaster import AttributeAwareForecaster
+from demand_forecaster.dataio import read_table, write_table
 
 def forecast_cli():
     parser = argparse.ArgumentParser(description="Demand Forecaster CLI")
@@ -40,8 +40,8 @@ def forecast_cli():
     # -----------------------------
     # Load Data
     # -----------------------------
-    sales_df = pd.read_csv(args.sales)
-    events_df = pd.read_csv(args.events) if args.events else None
+    sales_df = read_table(args.sales)
+    events_df = read_table(args.events) if args.events else None
     attributes = args.attributes.split(",") if args.attributes else None
 
     # -----------------------------
@@ -57,7 +57,7 @@ def forecast_cli():
         horizon_periods=args.horizon
     )
 
-    forecast_df.to_csv(args.output, index=False)
+    write_table(forecast_df, args.output)
     print(f"\n✅ Forecast complete! Saved to {args.output}\n")
 
 if __name__ == "__main__":
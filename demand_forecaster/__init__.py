@@ -1 +1,2 @@
 from .forecaster import AttributeAwareForecaster
+from .hierarchy import HierarchicalForecaster
@@ -0,0 +1,117 @@
+import numpy as np
+from .baselines import lookback_windows, wma_rows, median_rows
+from .calendar_dim import day_numbers, to_datetimes
+
+SUMS = ('n', 'abs_error', 'error', 'abs_actual')
+
+# ---- helpers ----
+def backtest_targets(cutoffs, freq, horizon_periods, calendar):
+    """Horizon targets of every cutoff, flattened cutoff-major: (limit, key, season, end).
+    W/M cutoffs snap to the start of their period, like forecast(horizon_start=...);
+    `limit` is the snapped cutoff (history must end before it), [key, end) the
+    target period and `season` its weekday / week-of-month / month. `calendar` must
+    cover the cutoffs and the horizon after them.
+    """
+    days = day_numbers(cutoffs)
+    limit = days if freq == 'D' else calendar.take('week' if freq == 'W' else 'month_start', days)
+    step = np.arange(int(horizon_periods))
+    if freq == 'M':
+        bounds = [limit]
+        for _ in step:
+            bounds.append(calendar.take('month_start', bounds[-1] + 32))
+        bounds = np.column_stack(bounds)
+        key, end = bounds[:, :-1].ravel(), bounds[:, 1:].ravel()
+        season = calendar.take('month', key)
+    else:
+        days = 7 if freq == 'W' else 1
+        key = (limit[:, None] + step[None, :] * days).ravel()
+        end = key + days
+        season = calendar.take('week_of_month' if freq == 'W' else 'dow', key)
+    return to_datetimes(np.repeat(limit, len(step))), to_datetimes(key), season, to_datetimes(end)
+
+def _windows(parts, season, limit, n):
+    """Last n values of each target's season partition whose key is before its limit."""
+    mat, valid = np.full((len(season), n), np.nan), np.zeros((len(season), n), dtype=bool)
+    for s in np.unique(season):
+        sel = season == s
+        keys, values = parts.get(int(s), (limit[:0], np.empty(0)))
+        mat[sel], valid[sel] = lookback_windows(keys, values, limit[sel], n)
+    return mat, valid
+
+def _cumulative(dates, values):
+    """Date-sorted dates with running sums of values, non-null counts and rows."""
+    order = np.argsort(dates, kind='stable')
+    d, v = dates[order], np.asarray(values, dtype=float)[order]
+    ok = ~np.isnan(v)
+    return (d, np.concatenate([[0.0], np.cumsum(np.where(ok, v, 0.0))]), np.concatenate([[0], np.cumsum(ok)]),
+            np.arange(len(d) + 1))
+
+def _range_sums(cum, lo, hi):
+    """(sum, non-null count, rows) of the history in each [lo, hi)."""
+    d, csum, cok, crows = cum
+    i, j = np.searchsorted(d, lo), np.searchsorted(d, hi)
+    return csum[j] - csum[i], cok[j] - cok[i], crows[j] - crows[i]
+
+def _push(mat, valid, rows, value):
+    """Append `value` as the newest point of the windows in `rows` (dropping the oldest)."""
+    if rows.any() and mat.shape[1]:
+        mat[rows] = np.column_stack([mat[rows, 1:], value[rows]])
+        valid[rows] = np.column_stack([valid[rows, 1:], np.ones(rows.sum(), dtype=bool)])
+
+def backtest_group(dates, values, parts, recent, targets, lookbacks, methods, partial=None):
+    """Error sums of one group for every (method, lookback) over all targets.
+
+    parts: {season: (keys, values)} with keys that must fall before a target's limit
+    (dates for D, last day of each period for W/M); recent: (keys, values, n, nan_mean)
+    for the recent-average fallback; partial: (start, season) per target of the period
+    cut by its limit, whose partial sum a fit on the truncated history would hold as
+    its newest period. Returns {(method, lookback): {n, abs_error, error, abs_actual}}.
+    """
+    limit, key, season, end = targets
+    cum = _cumulative(dates, values)
+    total, count, _ = _range_sums(cum, key, end)
+    actual = np.where(count > 0, total, np.nan)
+    n_max = max(max(lookbacks), 0)
+    mat, valid = _windows(parts, season, limit, n_max)
+    r_keys, r_values, r_n, nan_mean = recent
+    rmat, rvalid = lookback_windows(r_keys, r_values, limit, r_n)
+    if partial is not None:
+        p_start, p_season = partial
+        p_sum, _, p_rows = _range_sums(cum, p_start, limit)
+        _push(mat, valid, (p_rows > 0) & (p_season == season), p_sum)
+        _push(rmat, rvalid, p_rows > 0, p_sum)
+    # recent-average fallback as seen from each cutoff
+    rvalid &= ~np.isnan(rmat)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fallback = np.where(rvalid, rmat, 0.0).sum(axis=1) / rvalid.sum(axis=1)
+    fallback = np.where(rvalid.any(axis=1), fallback, np.nan if nan_mean else 0.0)
+    ok = ~np.isnan(actual)
+    a = actual[ok]
+    out = {}
+    for method in methods:
+        reduce = wma_rows if method == 'wma' else median_rows
+        for n in lookbacks:
+            base = reduce(mat[:, n_max - n:], valid[:, n_max - n:])
+            base = np.where(np.isnan(base), fallback, base)
+            f = np.where(base > 0.0, base, 0.0)[ok]
+            out[(method, n)] = {'n': len(a), 'abs_error': np.abs(f - a).sum(), 'error': (f - a).sum(),
+                                'abs_actual': np.abs(a).sum()}
+    return out
+
+def add_metrics(df):
+    """WAPE, bias (signed WAPE) and MAE from the error sums of `df`."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        df['wape'] = df['abs_error'] / df['abs_actual']
+        df['bias'] = df['error'] / df['abs_actual']
+        df['mae'] = df['abs_error'] / df['n']
+    return df
+
+def best_lookbacks(results, attributes, level, metric='wape'):
+    """{(freq, prefix): lookback} with the best pooled `metric` per attribute prefix of
+    length `level` (prefix () pools every group)."""
+    prefix = list(attributes[:level])
+    pooled = results.groupby(['horizon_freq'] + prefix + ['lookback'], sort=True)[list(SUMS)].sum().reset_index()
+    pooled = add_metrics(pooled).sort_values(['horizon_freq'] + prefix + [metric, 'lookback'], kind='stable')
+    best = pooled.dropna(subset=[metric]).drop_duplicates(['horizon_freq'] + prefix)
+    return {(row[0], tuple(row[1:-1])): int(row[-1])
+            for row in best[['horizon_freq'] + prefix + ['lookback']].itertuples(index=False)}
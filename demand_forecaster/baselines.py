@@ -0,0 +1,142 @@
+import warnings
+import numpy as np
+
+def seasonal_split(keys, values, season):
+    """Partition a series into {season: (keys, values)} arrays sorted by key.
+    Each partition is sorted on its own, as `sort_values` would on the filtered
+    frame, so rows sharing a key tie-break the same way.
+    """
+    keys = np.asarray(keys)
+    values = np.asarray(values, dtype=float)
+    season = np.asarray(season)
+    parts = {}
+    for s in np.unique(season):
+        k, v = keys[season == s], values[season == s]
+        order = np.argsort(k, kind='quicksort')
+        parts[int(s)] = (k[order], v[order])
+    return parts
+
+def batch_seasonal_split(offsets, keys, values, season):
+    """`seasonal_split` of every group of a CSR table (group g owns rows
+    offsets[g]:offsets[g+1]) with one sort; see slice_seasonal_split."""
+    offsets = np.asarray(offsets)
+    codes = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    season = np.asarray(season)
+    order = np.lexsort((keys, season, codes))
+    season = season[order]
+    new = np.ones(len(order), dtype=bool)
+    new[1:] = (codes[1:] != codes[:-1]) | (season[1:] != season[:-1])
+    return {'offsets': offsets, 'keys': np.asarray(keys)[order], 'values': np.asarray(values, dtype=float)[order],
+            'season': season, 'starts': np.append(np.flatnonzero(new), len(order))}
+
+def slice_seasonal_split(split, g):
+    """{season: (keys, values)} views of group g from a batch_seasonal_split result."""
+    starts = split['starts']
+    lo, hi = np.searchsorted(starts, split['offsets'][g:g + 2])
+    return {int(split['season'][starts[j]]): (split['keys'][starts[j]:starts[j + 1]], split['values'][starts[j]:starts[j + 1]])
+            for j in range(lo, hi)}
+
+def lookback_windows(keys, values, targets, n):
+    """For every target return the last n values whose key is strictly below it.
+    Rows are right-aligned and left-padded with NaN; `valid` flags the real points.
+    """
+    targets = np.asarray(targets)
+    n = max(int(n), 0)
+    if len(values) == 0 or n == 0:
+        return np.full((len(targets), n), np.nan), np.zeros((len(targets), n), dtype=bool)
+    k = np.searchsorted(keys, targets, side='left')
+    idx = k[:, None] - n + np.arange(n)[None, :]
+    valid = idx >= 0
+    mat = np.where(valid, values[np.clip(idx, 0, None)], np.nan)
+    return mat, valid
+
+def wma_rows(mat, valid):
+    """Row-wise `utils.wma` over right-aligned windows (weights 1..n, NaN if empty)."""
+    w = np.cumsum(valid, axis=1) * valid
+    den = w.sum(axis=1).astype(float)
+    num = (np.where(valid, mat, 0.0) * w).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / np.where(den > 0, den, 1.0), np.nan)
+
+def median_rows(mat, valid):
+    """Row-wise `utils.median` (NaN-aware median, NaN if empty)."""
+    if mat.shape[1] == 0:
+        return np.full(mat.shape[0], np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmedian(np.where(valid, mat, np.nan), axis=1)
+
+def seasonal_baseline(parts, targets, target_season, n, method='wma'):
+    """Score every target against the lookback window of its own season.
+    parts: output of `seasonal_split`; targets/target_season: aligned arrays.
+    """
+    targets = np.asarray(targets)
+    target_season = np.asarray(target_season)
+    out = np.full(len(targets), np.nan)
+    reduce = wma_rows if method == 'wma' else median_rows
+    for s in np.unique(target_season):
+        sel = target_season == s
+        keys, values = parts.get(int(s), (targets[:0], np.empty(0)))
+        mat, valid = lookback_windows(keys, values, targets[sel], n)
+        out[sel] = reduce(mat, valid)
+    return out
+
+def batch_period_tables(codes, starts, values, n_groups):
+    """Per-period {'start', 'sum', 'count'} table (sum skips NaN, count is the number of
+    non-null values) of every group in one pass: `codes` is the group of each row and
+    `starts` the day number of its period start (see Calendar). Returns a CSR table
+    {'offsets', 'start', 'sum', 'count'}; group g owns rows offsets[g]:offsets[g+1].
+    """
+    values = np.asarray(values, dtype=float)
+    ok = ~np.isnan(values)
+    table, inverse = _period_rows(codes, starts, n_groups)
+    n = len(table['start'])
+    table['sum'] = np.bincount(inverse, np.where(ok, values, 0.0), minlength=n)
+    table['count'] = np.bincount(inverse, ok, minlength=n).astype(np.int64)
+    return table
+
+def _period_rows(codes, starts, n_groups):
+    # sorted unique (group, period start day) pairs as a CSR table, plus each row's pair
+    starts = np.asarray(starts, dtype=np.int64)
+    lo = starts.min() if len(starts) else 0
+    span = (starts.max() - lo + 1) if len(starts) else 1
+    pair, inverse = np.unique(np.asarray(codes, dtype=np.int64) * span + (starts - lo), return_inverse=True)
+    return {'offsets': np.searchsorted(pair // span, np.arange(n_groups + 1)),
+            'start': (pair % span + lo).astype('datetime64[D]').astype('datetime64[ns]')}, inverse
+
+def slice_period_table(tables, g):
+    """Period table of group g from a batch_period_tables result."""
+    lo, hi = tables['offsets'][g], tables['offsets'][g + 1]
+    return {'start': tables['start'][lo:hi], 'sum': tables['sum'][lo:hi], 'count': tables['count'][lo:hi]}
+
+def concat_period_tables(parts):
+    """Join batch_period_tables results of consecutive group ranges."""
+    offsets = [np.zeros(1, dtype=np.int64)]
+    for t in parts:
+        offsets.append(t['offsets'][1:] + offsets[-1][-1])
+    out = {k: np.concatenate([t[k] for t in parts]) for k in ('start', 'sum', 'count')}
+    out['offsets'] = np.concatenate(offsets)
+    return out
+
+def stack_period_tables(tables):
+    """batch_period_tables-style CSR table of a list of one-group period tables."""
+    out = {k: np.concatenate([t[k] for t in tables]) for k in ('start', 'sum', 'count')}
+    out['offsets'] = np.concatenate([[0], np.cumsum([len(t['start']) for t in tables])]).astype(np.int64)
+    return out
+
+def merge_period_tables(a, b):
+    """Combine two batch_period_tables results over the same groups (e.g. fitted
+    history + appended rows): periods of a group present in both are added up."""
+    n = len(a['offsets']) - 1
+    codes = np.concatenate([np.repeat(np.arange(n), np.diff(t['offsets'])) for t in (a, b)])
+    starts = np.concatenate([a['start'], b['start']]).astype('datetime64[D]').astype(np.int64)
+    table, inverse = _period_rows(codes, starts, n)
+    m = len(table['start'])
+    table['sum'] = np.bincount(inverse, np.concatenate([a['sum'], b['sum']]), minlength=m)
+    table['count'] = np.bincount(inverse, np.concatenate([a['count'], b['count']]), minlength=m).astype(np.int64)
+    return table
+
+def recent_tail(dates, values, n):
+    """(dates, values) of the last n points in date order (ties keep input order)."""
+    order = np.argsort(dates, kind='stable')[-n:] if n > 0 else np.empty(0, dtype=np.int64)
+    return np.asarray(dates)[order], np.asarray(values, dtype=float)[order]
@@ -0,0 +1,2 @@
+from .synth import make_dataset, make_events
+from .suite import run_suite, run_case, compare, speedup, load_report, save_report
@@ -0,0 +1,58 @@
+import argparse, os, sys
+from .synth import make_dataset
+from .suite import FREQS, METHODS, run_suite, compare, speedup, load_report, save_report
+
+def main():
+    p = argparse.ArgumentParser(description='Demand Forecaster benchmarks (synthetic data)')
+    # Data scale
+    p.add_argument('--groups', type=int, default=100, help='Number of (region, store, item) groups')
+    p.add_argument('--history_days', type=int, default=365)
+    p.add_argument('--horizon_days', type=int, default=90)
+    p.add_argument('--promo_density', type=float, default=0.05, help='Share of days on promotion')
+    p.add_argument('--events', type=int, default=20, help='Number of events')
+    p.add_argument('--seed', type=int, default=0)
+    # Cases
+    p.add_argument('--freqs', nargs='*', choices=FREQS, default=list(FREQS))
+    p.add_argument('--methods', nargs='*', choices=METHODS, default=list(METHODS))
+    p.add_argument('--repeat', type=int, default=3, help='Timed runs per case (best is kept)')
+    p.add_argument('--n_jobs', type=int, default=None)
+    p.add_argument('--speedup', action='store_true', help='Also run serially and print the --n_jobs speedup per case')
+    # Output / gating
+    p.add_argument('--out', help='Write the JSON report here')
+    p.add_argument('--baseline', help='JSON report to compare against; exits 1 on regressions')
+    p.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown/growth vs baseline')
+    p.add_argument('--dump_data', help='Only write the synthetic sales/events/future_plan CSVs to this directory')
+
+    args = p.parse_args()
+
+    if args.dump_data:
+        data = make_dataset(args.groups, args.history_days, args.horizon_days, args.promo_density, args.events, seed=args.seed)
+        os.makedirs(args.dump_data, exist_ok=True)
+        for name, df in data.items():
+            df.to_csv(os.path.join(args.dump_data, f'{name}.csv'), index=False)
+        print(f"Synthetic data saved to {args.dump_data}")
+        return
+
+    report = run_suite(args.groups, args.history_days, args.horizon_days, args.promo_density, args.events,
+                       seed=args.seed, freqs=args.freqs, methods=args.methods, n_jobs=args.n_jobs, repeat=args.repeat)
+    for r in report['results']:
+        print(f"{r['case']:<10} fit {r['fit_s']:8.3f}s  forecast {r['forecast_s']:8.3f}s  "
+              f"peak {r['fit_peak_mb']:8.1f} / {r['forecast_peak_mb']:8.1f} MB  rows {r['rows']}")
+    if args.speedup:
+        serial = run_suite(args.groups, args.history_days, args.horizon_days, args.promo_density, args.events,
+                           seed=args.seed, freqs=args.freqs, methods=args.methods, repeat=args.repeat)
+        for r in speedup(serial, report):
+            print(f"{r['case']:<10} n_jobs={args.n_jobs} speedup  fit x{r['fit']:.2f}  forecast x{r['forecast']:.2f}")
+    if args.out:
+        save_report(report, args.out)
+        print(f"Report saved to {args.out}")
+    if args.baseline:
+        regressions = compare(report, load_report(args.baseline), tolerance=args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['metric']}: {r['baseline']:.3f} -> {r['value']:.3f} (x{r['ratio']:.2f})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == '__main__':
+    main()
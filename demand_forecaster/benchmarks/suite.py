@@ -0,0 +1,103 @@
+import json
+import platform
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from ..forecaster import AttributeAwareForecaster
+from .synth import make_dataset
+
+FREQS = ('D', 'W', 'M')
+METHODS = ('wma', 'median')
+METRICS = ('fit_s', 'forecast_s', 'fit_peak_mb', 'forecast_peak_mb')
+
+# ---- helpers ----
+def horizon_periods(horizon_days, freq):
+    return {'D': horizon_days, 'W': -(-horizon_days // 7), 'M': -(-horizon_days // 30)}[freq]
+
+def _model(freq, method, n_jobs):
+    return AttributeAwareForecaster(method=method, attributes=['region', 'store', 'item'], horizon_freq=freq,
+                                    use_trends=True, use_promotions=True, use_events=True, n_jobs=n_jobs)
+
+def _peak_mb(func):
+    # peak traced allocation (NumPy buffers included) of one call
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+def run_case(data, freq, method, horizon_days, n_jobs=None, repeat=3):
+    """Time fit and forecast (best of `repeat`) and measure their peak memory in an
+    extra, untimed run."""
+    sales, events, plan = data['sales'], data['events'], data['future_plan']
+    kw = dict(horizon_start=plan['date'].min(), horizon_periods=horizon_periods(horizon_days, freq),
+              future_plan=plan, future_events=events)
+    fit_s, forecast_s = [], []
+    for _ in range(max(int(repeat), 1)):
+        model = _model(freq, method, n_jobs)
+        t0 = time.perf_counter()
+        model.fit(sales, events)
+        t1 = time.perf_counter()
+        out = model.forecast(**kw)
+        t2 = time.perf_counter()
+        fit_s.append(t1 - t0)
+        forecast_s.append(t2 - t1)
+    model = _model(freq, method, n_jobs)
+    fit_peak = _peak_mb(lambda: model.fit(sales, events))
+    forecast_peak = _peak_mb(lambda: model.forecast(**kw))
+    return {'case': f'{freq}-{method}', 'horizon_freq': freq, 'method': method, 'rows': len(out),
+            'fit_s': min(fit_s), 'forecast_s': min(forecast_s),
+            'fit_peak_mb': fit_peak, 'forecast_peak_mb': forecast_peak}
+
+# ---- API ----
+def run_suite(n_groups=100, history_days=365, horizon_days=90, promo_density=0.05, n_events=20, seed=0,
+              freqs=FREQS, methods=METHODS, n_jobs=None, repeat=3):
+    """Benchmark fit/forecast on one synthetic dataset for every freq x method.
+    Returns a JSON-serializable {'params', 'env', 'results'} report.
+    """
+    params = dict(n_groups=n_groups, history_days=history_days, horizon_days=horizon_days,
+                  promo_density=promo_density, n_events=n_events, seed=seed, n_jobs=n_jobs, repeat=repeat)
+    data = make_dataset(n_groups, history_days, horizon_days, promo_density, n_events, seed=seed)
+    results = [run_case(data, f, m, horizon_days, n_jobs, repeat) for f in freqs for m in methods]
+    env = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+           'machine': platform.machine(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    return {'params': params, 'env': env, 'results': results}
+
+def compare(report, baseline, tolerance=0.25, min_delta=None):
+    """Regressions of `report` against a `baseline` report of the same params: every
+    case metric above baseline * (1 + tolerance) and by more than min_delta (seconds
+    or MB, default 0.05 / 1.0) is returned as {'case', 'metric', 'baseline', 'value', 'ratio'}.
+    """
+    if report['params'] != baseline['params']:
+        raise ValueError(f"Benchmark params differ from baseline: {report['params']} vs {baseline['params']}")
+    min_delta = min_delta or {'fit_s': 0.05, 'forecast_s': 0.05, 'fit_peak_mb': 1.0, 'forecast_peak_mb': 1.0}
+    base = {r['case']: r for r in baseline['results']}
+    out = []
+    for r in report['results']:
+        b = base.get(r['case'])
+        if b is None:
+            continue
+        for metric in METRICS:
+            value, ref = r[metric], b[metric]
+            if value > ref * (1 + tolerance) and value - ref > min_delta[metric]:
+                out.append({'case': r['case'], 'metric': metric, 'baseline': ref, 'value': value,
+                            'ratio': value / ref if ref else float('inf')})
+    return out
+
+def speedup(serial, parallel):
+    """Serial over parallel seconds of every case in two run_suite reports (e.g. without
+    and with n_jobs): [{'case', 'fit', 'forecast'}], above 1 where the workers are faster."""
+    base = {r['case']: r for r in serial['results']}
+    return [{'case': r['case'], 'fit': base[r['case']]['fit_s'] / r['fit_s'],
+             'forecast': base[r['case']]['forecast_s'] / r['forecast_s']}
+            for r in parallel['results'] if r['case'] in base]
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
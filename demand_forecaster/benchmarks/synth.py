@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+REGIONS = ('East', 'West', 'North', 'South')
+EVENT_NAMES = ('HolidayLongWeekend', 'CityMarathon', 'StormSpell', 'Festival', 'SportsFinal', 'Heatwave')
+
+# ---- helpers ----
+def group_keys(n_groups, items_per_store=25):
+    """(region, store, item) for n groups: stores hold up to `items_per_store` items
+    and are dealt round-robin over the regions."""
+    g = np.arange(n_groups)
+    store = g // items_per_store
+    region = np.asarray(REGIONS, dtype=object)[store % len(REGIONS)]
+    return pd.DataFrame({'region': region,
+                         'store': np.char.add('S', (store + 1).astype(str)).astype(object),
+                         'item': np.char.add('I', (g % items_per_store + 1).astype(str)).astype(object)})
+
+def _plan(rng, n_rows, promo_density):
+    promo = (rng.random(n_rows) < promo_density).astype(np.int64)
+    discount = np.where(promo == 1, rng.choice([0.05, 0.1, 0.2, 0.3], n_rows), 0.0)
+    return promo, discount
+
+def make_events(n_events, start, end, seed=0):
+    """Events frame (event_id, event_name, start_date, end_date, region) spread over
+    [start, end]; about a third are global (no region)."""
+    rng = np.random.default_rng(seed)
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    first = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n_events), unit='D')
+    last = first + pd.to_timedelta(rng.integers(0, 3, n_events), unit='D')
+    region = np.asarray(REGIONS, dtype=object)[rng.integers(0, len(REGIONS), n_events)]
+    region[rng.random(n_events) < 1 / 3] = None
+    return pd.DataFrame({'event_id': np.arange(1, n_events + 1),
+                         'event_name': np.asarray(EVENT_NAMES, dtype=object)[rng.integers(0, len(EVENT_NAMES), n_events)],
+                         'start_date': first.strftime('%Y-%m-%d'), 'end_date': last.strftime('%Y-%m-%d'),
+                         'region': region})
+
+def make_dataset(n_groups=100, history_days=365, horizon_days=90, promo_density=0.05, n_events=20,
+                 start='2024-01-01', seed=0):
+    """Seeded synthetic retail data in the schemas of `examples/`.
+
+    Returns {'sales', 'events', 'future_plan'} frames: daily sales per (region, store,
+    item) with weekly and yearly seasonality, a mild trend, promo/discount and event
+    lifts plus noise; events over history and horizon; and a daily promo/discount
+    plan for every group over the `horizon_days` after the history.
+    """
+    rng = np.random.default_rng(seed)
+    keys = group_keys(n_groups)
+    dates = pd.date_range(start, periods=history_days, freq='D')
+    horizon = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=horizon_days, freq='D')
+    events = make_events(n_events, dates[0], horizon[-1], seed=seed + 1)
+
+    n = n_groups * history_days
+    level = np.repeat(rng.lognormal(4.5, 0.5, n_groups), history_days)
+    t = np.tile(np.arange(history_days), n_groups)
+    dow = np.tile(dates.dayofweek.to_numpy(), n_groups)
+    weekly = np.array([0.9, 0.85, 0.9, 0.95, 1.1, 1.25, 1.05])[dow]
+    yearly = 1 + 0.15 * np.sin(2 * np.pi * (np.tile(dates.dayofyear.to_numpy(), n_groups) / 365.25))
+    trend = 1 + np.repeat(rng.normal(0, 0.1, n_groups), history_days) * t / 365.0
+    promo, discount = _plan(rng, n, promo_density)
+    lift = np.where(promo == 1, 1.3, 1.0) * (1 + 2.0 * discount)
+    # event lift on days an event covers the group's region (or every region)
+    ev_lift = np.ones(n)
+    region = np.repeat(keys['region'].to_numpy(), history_days)
+    day = np.tile(np.arange(history_days), n_groups)
+    for ev in events.itertuples():
+        lo = (pd.Timestamp(ev.start_date) - dates[0]).days
+        hi = (pd.Timestamp(ev.end_date) - dates[0]).days
+        hit = (day >= lo) & (day <= hi)
+        if ev.region is not None:
+            hit &= region == ev.region
+        ev_lift[hit] *= 1.2
+    sales = level * weekly * yearly * trend * lift * ev_lift * rng.normal(1, 0.1, n).clip(0.5)
+    sales_df = pd.DataFrame({'date': np.tile(dates.values, n_groups)})
+    for c in keys.columns:
+        sales_df[c] = np.repeat(keys[c].to_numpy(), history_days)
+    sales_df['sales'] = sales.round(2)
+    sales_df['promo_flag'] = promo
+    sales_df['discount'] = discount
+
+    m = n_groups * horizon_days
+    plan = pd.DataFrame({'date': np.tile(horizon.values, n_groups)})
+    for c in keys.columns:
+        plan[c] = np.repeat(keys[c].to_numpy(), horizon_days)
+    plan['promo_flag'], plan['discount'] = _plan(rng, m, promo_density)
+    return {'sales': sales_df, 'events': events, 'future_plan': plan}
@@ -0,0 +1,175 @@
+import copy
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import MutableMapping
+import numpy as np
+
+# bump when forecast semantics change, so old entries stop matching
+CACHE_VERSION = 1
+
+# constructor arguments that change forecasts (lookback_config is hashed per group)
+_CONFIG = ('method', 'attributes', 'horizon_freq', 'use_trends', 'use_promotions', 'use_events', 'date_col',
+           'target_col', 'promo_col', 'discount_col', 'event_name_col', 'week_start', 'event_lag_days')
+
+# ---- helpers ----
+def _local_codes(codes, names):
+    """Event codes renumbered by name among the events a slice uses, plus those names,
+    so a group's hash does not depend on which events other groups saw."""
+    codes = np.asarray(codes)
+    used = np.unique(codes[codes >= 0])
+    local = np.asarray(names, dtype=object)[used]
+    order = np.argsort(local.astype(str), kind='stable')
+    remap = np.full(len(names) + 1, -1, dtype=np.int64)
+    remap[used[order]] = np.arange(len(used))
+    return remap[codes], [str(n) for n in local[order]]
+
+def config_hash(model, horizon_dates):
+    """Hash of everything shared by all groups of one forecast: config and horizon."""
+    h = hashlib.blake2b(digest_size=16)
+    config = {name: getattr(model, name) for name in _CONFIG}
+    h.update(json.dumps([CACHE_VERSION, config], sort_keys=True, default=str).encode())
+    h.update(np.asarray(horizon_dates, dtype='datetime64[ns]').tobytes())
+    return h
+
+def group_fingerprints(model, keys, horizon_dates, grid):
+    """Fingerprint of each group's forecast inputs: its history slice (with merged
+    events), lookback entry, planned promo/discount and future events on the horizon,
+    plus the config and horizon. Equal fingerprints mean equal forecast rows."""
+    base = config_hash(model, horizon_dates)
+    store = model._store
+    lookbacks = model._lookbacks()[1]
+    out = []
+    for key in keys:
+        g = store.key_index[key]
+        h = base.copy()
+        lookback = {f: int(v[g]) for f, v in lookbacks.items()}
+        h.update(json.dumps([list(map(str, key)), lookback], sort_keys=True, default=str).encode())
+        cols = store.group(g)
+        for name in sorted(cols):
+            values = cols[name]
+            if name == 'event':
+                values, names = _local_codes(values, store.event_names)
+                h.update('\x1f'.join(names).encode())
+            h.update(name.encode())
+            h.update(np.ascontiguousarray(values).tobytes())
+        row = model._grid_rows(grid, g)
+        codes, names = _local_codes(grid['event_code'][row], grid['event_names'])
+        h.update('\x1f'.join(names).encode())
+        for arr in (grid['promo_flag'][row], grid['discount'][row], codes):
+            h.update(np.ascontiguousarray(arr).tobytes())
+        out.append(h.digest())
+    return out
+
+class ForecastCache:
+    """Persistent per-group forecast cache (a SQLite file at `path`).
+
+    Entries map a group fingerprint (see group_fingerprints) to its forecast rows and
+    trend factor. The least recently used entries are evicted once the stored rows
+    exceed `max_bytes`.
+    """
+    def __init__(self, path, max_bytes=256 * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path)
+        self._db.execute('CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, forecast BLOB, '
+                         'trend_factor REAL, size INTEGER, used INTEGER)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+
+    def get_many(self, fingerprints):
+        """{fingerprint: (forecast array, trend factor)} of the cached fingerprints; marks them used."""
+        out = {}
+        now = time.time_ns()
+        for i in range(0, len(fingerprints), 500):
+            part = list(fingerprints[i:i + 500])
+            marks = ','.join('?' * len(part))
+            rows = self._db.execute(f'SELECT key, forecast, trend_factor FROM entries WHERE key IN ({marks})', part)
+            for key, forecast, tf in rows:
+                out[bytes(key)] = (np.frombuffer(forecast, dtype=np.float64), tf)
+            self._db.execute(f'UPDATE entries SET used = ? WHERE key IN ({marks})', [now] + part)
+        self._db.commit()
+        return out
+
+    def put_many(self, items):
+        """Store {fingerprint: (forecast array, trend factor)}, then evict down to max_bytes."""
+        now = time.time_ns()
+        rows = []
+        for key, (forecast, tf) in items.items():
+            blob = np.ascontiguousarray(forecast, dtype=np.float64).tobytes()
+            rows.append((key, blob, float(tf), len(key) + len(blob) + 8, now))
+        self._db.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', rows)
+        self.evict()
+        self._db.commit()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        total = self.size()
+        if self.max_bytes is None or total <= self.max_bytes:
+            return 0
+        dropped = 0
+        for key, size in self._db.execute('SELECT key, size FROM entries ORDER BY used, rowid').fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            dropped += 1
+        return dropped
+
+    def size(self):
+        return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class LazyStates(MutableMapping):
+    """`_group_state` of a lazy fit: each group's state is built by
+    `builder._build_state(code, batch)` on first access, so groups served from a
+    ForecastCache never pay for it."""
+    def __init__(self, builder, batch, keys):
+        self._builder = builder
+        self._batch = batch
+        self._index = {k: g for g, k in enumerate(keys)}
+        self._states = {}
+
+    def bound_to(self, builder):
+        """Copy whose states are built by `builder` (e.g. a model shipped without its history)."""
+        out = copy.copy(self)
+        out._builder = builder
+        out._states = dict(self._states)
+        return out
+
+    def __getitem__(self, key):
+        state = self._states.get(key)
+        if state is None:
+            if key not in self._index:
+                raise KeyError(key)
+            state = self._states[key] = self._builder._build_state(self._index[key], self._batch)
+        return state
+
+    def __setitem__(self, key, state):
+        self._index.setdefault(key, state['code'])
+        self._states[key] = state
+
+    def __delitem__(self, key):
+        del self._index[key]
+        self._states.pop(key, None)
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+WEEKDAYS = {'MON':0,'TUE':1,'WED':2,'THU':3,'FRI':4,'SAT':5,'SUN':6}
+
+# period start column of each period-table frequency
+TABLE_KEYS = {'W': 'table_week', 'M': 'month_start', 'Y': 'year_start'}
+
+# ---- helpers ----
+def day_numbers(dates):
+    """Days since 1970-01-01 of datetime-like values (int64 array)."""
+    if not (isinstance(dates, np.ndarray) and dates.dtype.kind == 'M'):
+        dates = pd.DatetimeIndex(dates).values
+    return dates.astype('datetime64[D]').astype(np.int64)
+
+def to_datetimes(days):
+    """Inverse of day_numbers: datetime64[ns] array."""
+    return np.asarray(days, dtype=np.int64).astype('datetime64[D]').astype('datetime64[ns]')
+
+def _week_start(day, weekday):
+    # last day on or before `day` falling on `weekday` (Mon=0); 1970-01-01 was a Thursday
+    return day - (day + 3 - weekday) % 7
+
+class Calendar:
+    """Day-level calendar dimension for the days [first, last], computed once and
+    indexed by day number (see day_numbers). Int arrays per day:
+      dow            day of week (Mon=0)
+      week           start of the week beginning on `week_start` (period_start 'W')
+      table_week     start of the `W-<week_start>` period (the week ending on
+                     `week_start`) that weekly period tables are keyed by
+      week_of_month  1-based week of the month (utils.week_of_month)
+      month_start, month, year_start, year
+    Period starts are day numbers as well.
+    """
+    COLUMNS = ('dow', 'week', 'table_week', 'week_of_month', 'month_start', 'month', 'year_start', 'year')
+
+    def __init__(self, first, last, week_start='MON'):
+        self.week_start = week_start
+        self.first, self.last = int(first), int(last)
+        day = np.arange(self.first, self.last + 1, dtype=np.int64)
+        ws = WEEKDAYS[week_start]
+        self.dow = (day + 3) % 7
+        self.week = _week_start(day, ws)
+        self.table_week = _week_start(day, (ws + 1) % 7)
+        months = day.astype('datetime64[D]').astype('datetime64[M]')
+        years = months.astype('datetime64[Y]')
+        self.month_start = months.astype('datetime64[D]').astype(np.int64)
+        self.month = months.astype(np.int64) % 12 + 1
+        self.year_start = years.astype('datetime64[D]').astype(np.int64)
+        self.year = years.astype(np.int64) + 1970
+        self.week_of_month = (self.table_week - _week_start(self.month_start, (ws + 1) % 7)) // 7 + 1
+
+    @classmethod
+    def spanning(cls, lo, hi, week_start='MON'):
+        """Calendar over day numbers lo..hi, widened to whole years plus a week on
+        each side so period starts and period ends of every day in range are covered."""
+        lo = int(np.datetime64(int(lo), 'D').astype('datetime64[Y]').astype('datetime64[D]').astype(np.int64)) - 7
+        hi = int((np.datetime64(int(hi), 'D').astype('datetime64[Y]') + 1).astype('datetime64[D]').astype(np.int64)) + 7
+        return cls(lo, hi, week_start)
+
+    def covers(self, lo, hi):
+        return self.first <= lo and hi <= self.last
+
+    def take(self, column, days):
+        """Values of `column` for day numbers `days`."""
+        return getattr(self, column)[np.asarray(days, dtype=np.int64) - self.first]
+
+    def period_end(self, column, days):
+        """Last day (day number) of the `column` period (TABLE_KEYS value or 'week')
+        holding each day."""
+        start = self.take(column, days)
+        if column in ('week', 'table_week'):
+            return start + 6
+        step = 32 if column == 'month_start' else 366
+        return self.take(column, start + step) - 1
@@ -1,12 +1,17 @@
 
-import argparse, json, sys, pandas as pd
+import argparse, json, sys
 from .forecaster import AttributeAwareForecaster
+from .dataio import iter_table, read_table, attribute_dtypes, sales_dtypes, TableWriter
+from .persist import saved_config
+from .sharding import parse_shard, shard_path, shard_of, shard_filter, merge_shards
+from .cache import ForecastCache
+from .lookback import read_lookback_rules
 
 def main():
     p = argparse.ArgumentParser(description='Demand Forecaster CLI')
-    p.add_argument('--sales', required=True, help='Path to sales CSV')
-    p.add_argument('--events', required=False, default=None, help='Path to events CSV')
-    p.add_argument('--future_plan', required=False, default=None, help='Path to future plan CSV')
+    p.add_argument('--sales', required=False, default=None, help='Path to sales CSV/Parquet/Arrow (not needed with --model_in)')
+    p.add_argument('--events', required=False, default=None, help='Path to events CSV/Parquet/Arrow')
+    p.add_argument('--future_plan', required=False, default=None, help='Path to future plan CSV/Parquet/Arrow')
     p.add_argument('--attributes', nargs='*', default=[], help='Attribute columns, e.g., region store item')
     p.add_argument('--horizon_freq', choices=['D','W','M'], default='D', help='Forecast frequency')
     # Horizon options
@@ -20,23 +25,66 @@ def main():
     p.add_argument('--use_events', action='store_true')
     p.add_argument('--event_lag_days', type=int, default=0, help='Shift events by N days (can be negative)')
     p.add_argument('--week_start', choices=['MON','TUE','WED','THU','FRI','SAT','SUN'], default='MON')
+    p.add_argument('--n_jobs', type=int, default=None, help='Worker processes for fit/forecast (-1 = all cores)')
+    p.add_argument('--chunksize', type=int, default=None, help='Stream sales in chunks of N rows during fit')
+    p.add_argument('--profile', help='Write per-stage timings of fit/forecast to this JSON file')
+    p.add_argument('--compact', action='store_true', help='Fit with float32 sales, int8 promo flags and categorical keys')
+    p.add_argument('--max_memory', help="Fit memory budget (e.g. 4GB): process groups in batches, spill the history to disk")
+    p.add_argument('--batch_groups', type=int, default=1000, help='Groups per output batch written to --out')
     # Lookback config
     p.add_argument('--lookback_json', help='JSON string or path to JSON file for lookback config')
+    p.add_argument('--lookback_file', help='CSV/Parquet lookback overrides: attribute prefix columns plus D/W/M columns')
     # Column names
     p.add_argument('--date_col', default='date')
     p.add_argument('--target_col', default='sales')
     p.add_argument('--promo_col', default='promo_flag')
     p.add_argument('--discount_col', default='discount')
     p.add_argument('--event_name_col', default='event_name')
+    # Saved models
+    p.add_argument('--model_in', help='Forecast from a model saved with --model_out instead of fitting')
+    p.add_argument('--model_out', help='Directory to save the fitted model to')
+    # Change-detection cache
+    p.add_argument('--cache', help='SQLite file caching per-group forecasts; groups whose inputs are unchanged are reused')
+    p.add_argument('--cache_max_mb', type=float, default=256, help='Size bound of --cache (least recently used entries are evicted)')
+    # Sharding
+    p.add_argument('--shard', help="Only run shard k of N ('k/N', 0 <= k < N); groups are assigned by a stable hash "
+                                   "of their --attributes values and '{shard}' in file paths is replaced by k")
+    p.add_argument('--merge', nargs='+', help='Combine shard outputs into --out, sorted like a single-node run, and exit')
     # Output
-    p.add_argument('--out', required=True, help='Output CSV path')
+    p.add_argument('--out', required=False, default=None, help='Output path (.csv, .parquet or .feather/.arrow)')
 
     args = p.parse_args()
+    if args.merge:
+        if not args.out:
+            p.error('--merge needs --out')
+        rows = merge_shards(args.merge, args.out, args.attributes)
+        print(f"Merged {len(args.merge)} shard outputs ({rows} rows) into {args.out}")
+        return
+    try:
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        p.error(str(e))
+    for name in ('sales', 'events', 'future_plan', 'model_in', 'model_out', 'out', 'profile', 'cache'):
+        setattr(args, name, shard_path(getattr(args, name), shard))
+    if not args.sales and not args.model_in:
+        p.error('one of --sales or --model_in is required')
+    if not args.out and not args.model_out:
+        p.error('one of --out or --model_out is required')
 
-    # Load datasets
-    sales = pd.read_csv(args.sales, parse_dates=[args.date_col])
-    events = pd.read_csv(args.events) if args.events else None
-    future_plan = pd.read_csv(args.future_plan, parse_dates=[args.date_col]) if args.future_plan else None
+    # Load datasets (sales: only the columns the model reads, in compact dtypes)
+    sales_cols = [args.date_col] + list(args.attributes) + [args.target_col, args.promo_col, args.discount_col, args.event_name_col]
+    dtypes = sales_dtypes(args.attributes, args.target_col, args.promo_col, args.discount_col)
+    sales = None if args.model_in else iter_table(args.sales, columns=sales_cols, dtypes=dtypes, parse_dates=[args.date_col], chunksize=args.chunksize)
+    # events and plans join the sales (or saved model) keys: read their attributes the same way
+    attributes = args.attributes or (saved_config(args.model_in)['attributes'] if args.model_in else [])
+    keys = attribute_dtypes(attributes)
+    events = read_table(args.events, dtypes=keys) if args.events else None
+    future_plan = read_table(args.future_plan, dtypes=keys, parse_dates=[args.date_col]) if args.future_plan else None
+    if shard:
+        # keep only this shard's groups (sales chunk by chunk, as they are read)
+        sales = None if sales is None else (shard_filter(c, attributes, shard) for c in sales)
+        events = shard_filter(events, attributes, shard)
+        future_plan = shard_filter(future_plan, attributes, shard)
 
     # Load/parse lookback config
     lb = {'default': {'D':8,'W':6,'M':5}}
@@ -52,37 +100,87 @@ def main():
             print(f"Failed to parse lookback_json: {e}", file=sys.stderr)
 
     # Build model
-    model = AttributeAwareForecaster(method=args.method,
-                                     attributes=args.attributes,
-                                     horizon_freq=args.horizon_freq,
-                                     lookback_config=lb,
-                                     use_trends=args.use_trends,
-                                     use_promotions=args.use_promotions,
-                                     use_events=args.use_events,
-                                     date_col=args.date_col,
-                                     target_col=args.target_col,
-                                     promo_col=args.promo_col,
-                                     discount_col=args.discount_col,
-                                     event_name_col=args.event_name_col,
-                                     week_start=args.week_start,
-                                     event_lag_days=args.event_lag_days)
+    if args.model_in:
+        # fit-time settings (attributes, columns, week_start, event lag) come from the saved model;
+        # its tables cover every frequency, so forecast-time options are taken from this run
+        model = AttributeAwareForecaster.load(args.model_in, method=args.method, horizon_freq=args.horizon_freq,
+                                              lookback_config=lb, use_trends=args.use_trends,
+                                              use_promotions=args.use_promotions, use_events=args.use_events,
+                                              n_jobs=args.n_jobs, profile=bool(args.profile))
+        if args.lookback_file:
+            # rules are matched against the saved model's attributes
+            model.lookback_config = read_lookback_rules(args.lookback_file, model.attributes, base=lb)
+    else:
+        model = AttributeAwareForecaster(method=args.method,
+                                         attributes=args.attributes,
+                                         horizon_freq=args.horizon_freq,
+                                         lookback_config=lb,
+                                         use_trends=args.use_trends,
+                                         use_promotions=args.use_promotions,
+                                         use_events=args.use_events,
+                                         date_col=args.date_col,
+                                         target_col=args.target_col,
+                                         promo_col=args.promo_col,
+                                         discount_col=args.discount_col,
+                                         event_name_col=args.event_name_col,
+                                         week_start=args.week_start,
+                                         event_lag_days=args.event_lag_days,
+                                         n_jobs=args.n_jobs,
+                                         profile=bool(args.profile),
+                                         compact=args.compact,
+                                         max_memory=args.max_memory)
+        if args.lookback_file:
+            # added to --lookback_json (or the default); compiled per group at fit time
+            model.lookback_config = read_lookback_rules(args.lookback_file, model.attributes, base=lb)
 
-    model.fit(sales_df=sales, events_df=events)
+        # with a cache, group states are only built for groups that miss it
+        if args.chunksize:
+            model.fit_chunks(sales, events_df=events, lazy=bool(args.cache))
+        else:
+            model.fit(sales_df=next(sales), events_df=events, lazy=bool(args.cache))
+
+    if args.model_out:
+        model.save(args.model_out)
+        print(f"Model saved to {args.model_out}")
+    if not args.out:
+        write_profile(model, args.profile)
+        return
 
     # Horizon
     horizon_dates = None
     if args.horizon_csv:
-        hd = pd.read_csv(args.horizon_csv, parse_dates=[args.date_col])
+        hd = read_table(args.horizon_csv, parse_dates=[args.date_col])
         horizon_dates = hd[args.date_col].values
 
-    fcst = model.forecast(horizon_dates=horizon_dates,
-                          horizon_start=args.horizon_start,
-                          horizon_periods=args.horizon_periods,
-                          future_plan=future_plan,
-                          future_events=events)
+    # a saved model may hold other shards' groups too (e.g. one fitted on all sales)
+    groups = [k for k in model._store.keys if shard_of(k, shard[1]) == shard[0]] if shard and args.model_in else None
+    cache = ForecastCache(args.cache, max_bytes=int(args.cache_max_mb * 2**20)) if args.cache else None
+    batches = model.forecast_batches(horizon_dates=horizon_dates,
+                                     horizon_start=args.horizon_start,
+                                     horizon_periods=args.horizon_periods,
+                                     future_plan=future_plan,
+                                     future_events=events,
+                                     batch_groups=args.batch_groups,
+                                     cache=cache,
+                                     groups=groups)
 
-    fcst.to_csv(args.out, index=False)
+    # write each batch of groups as soon as it is forecast
+    with TableWriter(args.out) as out:
+        for fcst in batches:
+            out.write(fcst)
     print(f"Forecast saved to {args.out}")
+    if cache is not None:
+        cache.close()
+        st = model.cache_stats_
+        print(f"Cache: {st['hits']} of {st['hits'] + st['misses']} groups reused (hit rate {st['hit_rate']:.1%})")
+    write_profile(model, args.profile)
+
+def write_profile(model, path):
+    if not path:
+        return
+    with open(path, 'w') as f:
+        json.dump(model.profile_, f, indent=2, default=str)
+    print(f"Profile saved to {path}")
 
 if __name__ == '__main__':
     main()
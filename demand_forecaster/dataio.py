@@ -0,0 +1,120 @@
+import os
+import pandas as pd
+
+# file extension -> format; anything else is read/written as CSV
+_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.feather': 'arrow', '.arrow': 'arrow', '.ipc': 'arrow'}
+
+def table_format(path):
+    return _FORMATS.get(os.path.splitext(str(path))[1].lower(), 'csv')
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow I/O requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+def attribute_dtypes(attributes=None):
+    """Categorical attributes. Plans and events joined to the sales must be read with
+    them too, so CSV keys are text on both sides (e.g. a numeric store column)."""
+    return {a: 'category' for a in (attributes or [])}
+
+def sales_dtypes(attributes=None, target_col='sales', promo_col='promo_flag', discount_col='discount'):
+    """Compact dtypes for sales input: categorical attributes, float32 target/discount
+    and a nullable int8 promo flag."""
+    dt = attribute_dtypes(attributes)
+    dt.update({target_col: 'float32', promo_col: 'Int8', discount_col: 'float32'})
+    return dt
+
+def table_columns(path):
+    """Column names of a table file without reading its rows."""
+    fmt = table_format(path)
+    if fmt == 'csv':
+        return list(pd.read_csv(path, nrows=0).columns)
+    pa = _pyarrow()
+    if fmt == 'parquet':
+        return list(pa.parquet.read_schema(path).names)
+    with pa.memory_map(str(path)) as src:
+        return list(pa.ipc.open_file(src).schema.names)
+
+def _finish(df, dtypes, parse_dates):
+    for c in parse_dates or []:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c])
+    dt = {c: t for c, t in (dtypes or {}).items() if c in df.columns and str(df[c].dtype) != t}
+    return df.astype(dt) if dt else df
+
+def iter_table(path, columns=None, dtypes=None, parse_dates=None, chunksize=None):
+    """Yield a table file as DataFrames of at most `chunksize` rows (one frame if None).
+    `columns` projects the read (names missing from the file are ignored) and `dtypes`
+    are applied while parsing where the format allows it.
+    """
+    fmt = table_format(path)
+    if fmt == 'csv':
+        usecols = (lambda c: c in set(columns)) if columns is not None else None
+        dt = {c: t for c, t in (dtypes or {}).items() if c not in (parse_dates or [])}
+        reader = pd.read_csv(path, usecols=usecols, dtype=dt or None, parse_dates=list(parse_dates or []) or None,
+                             chunksize=chunksize)
+        if chunksize is None:
+            yield reader
+            return
+        for chunk in reader:
+            yield chunk
+        return
+    pa = _pyarrow()
+    available = table_columns(path)
+    cols = [c for c in columns if c in available] if columns is not None else None
+    if fmt == 'parquet' and chunksize:
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=int(chunksize), columns=cols):
+            yield _finish(batch.to_pandas(), dtypes, parse_dates)
+        return
+    if fmt == 'parquet':
+        yield _finish(pd.read_parquet(path, columns=cols), dtypes, parse_dates)
+        return
+    yield _finish(pd.read_feather(path, columns=cols), dtypes, parse_dates)
+
+def read_table(path, columns=None, dtypes=None, parse_dates=None):
+    """Read a whole CSV/Parquet/Arrow table (see iter_table)."""
+    return next(iter_table(path, columns, dtypes, parse_dates))
+
+class TableWriter:
+    """Append DataFrame batches to a CSV, Parquet or Arrow IPC file as they arrive."""
+    def __init__(self, path):
+        self.path = path
+        self.format = table_format(path)
+        self._writer = None
+        self._schema = None
+        self._header = True
+
+    def write(self, df):
+        if self.format == 'csv':
+            df.to_csv(self.path, index=False, mode='w' if self._header else 'a', header=self._header)
+            self._header = False
+            return
+        pa = _pyarrow()
+        if self._schema is None:
+            # all-missing object columns (e.g. event_name) are typed from the first batch as null
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            self._schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in schema])
+            if self.format == 'parquet':
+                self._writer = pa.parquet.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_table(df, path):
+    with TableWriter(path) as w:
+        w.write(df)
@@ -1,8 +1,30 @@
 
 import pandas as pd
 import numpy as np
-from .utils import ensure_datetime, week_of_month, period_start, wma, median, explode_events, safe_merge_events
-from .promotions import EmpiricalLifts
+from .utils import ensure_datetime, explode_events, safe_merge_events, frame_fingerprint, compact_frame, parse_memory
+from .promotions import (EmpiricalLifts, batch_lift_factors, batch_lift_stats, lift_stats, slice_lift_stats, merge_lift_stats,
+                         concat_lift_stats, lift_table)
+from .baselines import (seasonal_split, seasonal_baseline, batch_period_tables, slice_period_table, stack_period_tables,
+                        merge_period_tables, concat_period_tables, batch_seasonal_split, slice_seasonal_split, recent_tail)
+from .calendar_dim import TABLE_KEYS, Calendar, day_numbers, to_datetimes
+from .store import GroupStore
+from .parallel import (effective_jobs, fans_out, parallel_ranges, parallel_forecast_blocks, iter_forecast_blocks, parallel_base_trend,
+                       parallel_backtest)
+from .trends import TREND_LEVELS, trend_components, trend_factor
+from .persist import save_model, load_model
+from .profiling import make_profiler
+from .backtest import SUMS, backtest_targets, backtest_group, add_metrics, best_lookbacks
+from .cache import LazyStates, group_fingerprints
+from .lookback import DEFAULT_LOOKBACK, LookbackIndex
+
+# calendar column partitioning the W/M period tables
+_SEASONS = {'W': 'week_of_month', 'M': 'month'}
+# approximate peak bytes per history row of the vectorized fit passes (_range_lift_stats, _range_period_tables)
+_FIT_ROW_BYTES = 96
+
+def _nanmean(x):
+    x = x[~np.isnan(x)]
+    return float(x.mean()) if len(x) else np.nan
 
 class AttributeAwareForecaster:
     def __init__(self,
@@ -19,11 +41,15 @@ class AttributeAwareForecaster:
                  discount_col='discount',
                  event_name_col='event_name',
                  week_start='MON',
-                 event_lag_days=0):
+                 event_lag_days=0,
+                 n_jobs=None,                     # worker processes for fit/forecast (-1 = all cores)
+                 profile=False,                   # True, or callback(stage, seconds, rows, group), to time stages
+                 compact=False,                   # categorical keys/events, float32 sales, int8 promo flags
+                 max_memory=None):                # fit memory budget (bytes or '4GB'): batch groups, spill the store
         self.method = method
         self.attributes = attributes or []
         self.horizon_freq = horizon_freq
-        self.lookback_config = lookback_config or {'default': {'D':8,'W':6,'M':5}}
+        self.lookback_config = lookback_config or {'default': dict(DEFAULT_LOOKBACK)}
         self.use_trends = use_trends
         self.use_promotions = use_promotions
         self.use_events = use_events
@@ -34,102 +60,351 @@ class AttributeAwareForecaster:
         self.event_name_col = event_name_col
         self.week_start = week_start
         self.event_lag_days = event_lag_days
+        self.n_jobs = n_jobs
+        self.profile = profile
+        self.compact = compact
+        self.max_memory = max_memory
+        self._profiler = make_profiler(profile)
         self._group_state = {}
+        self._events_daily = None
+        self._events_cache = None
+        self._calendar_table = None
+        self._lookback_index = None
+        self._cache_stats = {'hits': 0, 'misses': 0}
         self._fitted = False
 
     # ----------------- helpers -----------------
+    def _lookbacks(self):
+        """(LookbackIndex, {freq: lookback per group code}) compiled from lookback_config
+        at fit time, and again once the config changes or groups are added."""
+        config = {k: dict(v) if isinstance(v, dict) else v for k, v in self.lookback_config.items()}
+        compiled = self._lookback_index
+        if compiled is None or compiled[0] != config or len(compiled[2]['D']) != len(self._store):
+            index = LookbackIndex(config)
+            compiled = self._lookback_index = (config, index, index.arrays(self._store.keys))
+        return compiled[1], compiled[2]
+
     def _resolve_lookback(self, key_tuple):
-        # Try exact -> partial -> default
-        if isinstance(self.lookback_config, dict):
-            if key_tuple in self.lookback_config:
-                return self.lookback_config[key_tuple]
-            for k, v in self.lookback_config.items():
-                if k == 'default': continue
-                if isinstance(k, tuple) and key_tuple[:len(k)] == k:
-                    return v
-        return self.lookback_config.get('default', {'D':8,'W':6,'M':5})
-
-    def _baseline_daily(self, hist, dt, lookback_n):
-        dow = dt.dayofweek
-        same = hist[(hist[self.date_col].dt.dayofweek==dow) & (hist[self.date_col] < dt)].sort_values(self.date_col)
-        values = same.tail(lookback_n)[self.target_col].tolist()
-        return wma(values) if self.method=='wma' else median(values)
-
-    def _baseline_weekly(self, hist, week_dt, lookback_n):
-        wom_target = int(week_of_month(week_dt, self.week_start))
-        start_alias = f'W-{self.week_start}'
-        tmp = hist.copy()
-        tmp['period_start'] = tmp[self.date_col].dt.to_period(start_alias).dt.start_time
-        weekly = tmp.groupby('period_start', as_index=False)[self.target_col].sum()
-        weekly['wom'] = weekly['period_start'].apply(lambda x: int(week_of_month(x, self.week_start)))
-        weekly_past = weekly[weekly['period_start'] < period_start(week_dt, 'W', self.week_start)]
-        same_wom = weekly_past[weekly_past['wom']==wom_target].sort_values('period_start')
-        values = same_wom.tail(lookback_n)[self.target_col].tolist()
-        base = wma(values) if self.method=='wma' else median(values)
-        return base
-
-    def _baseline_monthly(self, hist, month_dt, lookback_n):
-        target_month = month_dt.month
-        tmp = hist.copy()
-        tmp['month_start'] = tmp[self.date_col].dt.to_period('M').dt.start_time
-        monthly = tmp.groupby('month_start', as_index=False)[self.target_col].sum()
-        monthly_past = monthly[monthly['month_start'] < period_start(month_dt, 'M')]
-        monthly_past['month'] = monthly_past['month_start'].dt.month
-        same_month = monthly_past[monthly_past['month']==target_month].sort_values('month_start')
-        values = same_month.tail(lookback_n)[self.target_col].tolist()
-        base = wma(values) if self.method=='wma' else median(values)
-        return base
-
-    def _trend_factor(self, hist, dt):
-        h = hist[[self.date_col, self.target_col]].copy()
-        if h.empty:
-            return 1.0
-        # weekly
-        start_alias = f'W-{self.week_start}'
-        w = h.copy(); w['p'] = w[self.date_col].dt.to_period(start_alias)
-        weekly = np.nan
-        if not w.empty:
-            wp = w.groupby('p')[self.target_col].mean().reset_index()
-            if len(wp) >= 2 and wp.iloc[-2][self.target_col] not in [0, None, np.nan]:
-                weekly = (wp.iloc[-1][self.target_col] - wp.iloc[-2][self.target_col]) / wp.iloc[-2][self.target_col]
-        # monthly
-        m = h.copy(); m['p'] = m[self.date_col].dt.to_period('M')
-        monthly = np.nan
-        if not m.empty:
-            mp = m.groupby('p')[self.target_col].mean().reset_index()
-            if len(mp) >= 2 and mp.iloc[-2][self.target_col] not in [0, None, np.nan]:
-                monthly = (mp.iloc[-1][self.target_col] - mp.iloc[-2][self.target_col]) / mp.iloc[-2][self.target_col]
-        # yearly
-        y = h.copy(); y['p'] = y[self.date_col].dt.to_period('Y')
-        yearly = np.nan
-        if not y.empty:
-            yp = y.groupby('p')[self.target_col].mean().reset_index()
-            if len(yp) >= 2 and yp.iloc[-2][self.target_col] not in [0, None, np.nan]:
-                yearly = (yp.iloc[-1][self.target_col] - yp.iloc[-2][self.target_col]) / yp.iloc[-2][self.target_col]
-        arr = [v for v in [weekly, monthly, yearly] if not pd.isna(v)]
-        return 1.0 + float(np.nanmean(arr)) if arr else 1.0
+        # longest matching prefix per frequency, then 'default'
+        index, arrays = self._lookbacks()
+        g = self._store.key_index.get(key_tuple)
+        if g is None:
+            return index.resolve(key_tuple)
+        return {f: int(v[g]) for f, v in arrays.items()}
+
+    def _calendar(self, days):
+        """Calendar covering day numbers `days`, shared by fit, forecast and backtest;
+        rebuilt (widened) only when `days` fall outside the current one."""
+        lo, hi = (int(np.min(days)), int(np.max(days))) if len(days) else (0, 0)
+        cal = self._calendar_table
+        if cal is None or cal.week_start != self.week_start or not cal.covers(lo, hi):
+            if cal is not None and cal.week_start == self.week_start:
+                lo, hi = min(lo, cal.first), max(hi, cal.last)
+            cal = self._calendar_table = Calendar.spanning(lo, hi, self.week_start)
+        return cal
+
+    def _period_state(self, table, freq):
+        # compact period table (start, sum, count) plus week-of-month (W) / month (M) partitions;
+        # tables sliced from a batch come with them (see _split_tables)
+        if freq == 'Y':
+            return table
+        season, parts = table.get('season'), table.get('parts')
+        if parts is None:
+            start = day_numbers(table['start'])
+            season = self._calendar(start).take(_SEASONS[freq], start)
+            parts = seasonal_split(table['start'], table['sum'], season)
+        values = table['sum']
+        return dict(table, season=season, parts=parts, recent_mean=values[-6:].mean() if len(values) > 0 else 0.0)
+
+    def _split_tables(self, tables):
+        # season of every W/M period table row and the seasonal partitions of all groups, in one sort each
+        for f, column in _SEASONS.items():
+            t = tables[f]
+            start = day_numbers(t['start'])
+            t['season'] = self._calendar(start).take(column, start)
+            t['split'] = batch_seasonal_split(t['offsets'], t['start'], t['sum'], t['season'])
+        return tables
+
+    def _finalize_state(self, g, summ, lifts=None, key=None):
+        """Derive baseline partitions, trend and lifts of group code g from its summaries."""
+        state = {'code': g, 'recent': summ['recent'], 'lift_stats': summ['lift_stats'],
+                 'D': {'recent_mean': _nanmean(summ['recent'][1])},
+                 'lifts': lifts or EmpiricalLifts.from_stats(summ['lift_stats'], self._store.event_names)}
+        for f in ('W', 'M', 'Y'):
+            state[f] = self._period_state(summ[f], f)
+        with self._profiler.stage('trend', 1, key):
+            state['trend'] = trend_components(state)
+            state['trend_factor'] = trend_factor(state['trend'])
+        return state
+
+    def _batch_summaries(self):
+        """Lift statistics, lift table and period tables of every group, each in one
+        vectorized pass over the store (over consecutive group ranges under max_memory,
+        and across worker processes when n_jobs > 1)."""
+        budget = self._store_budget()
+        max_rows = budget and max(budget // _FIT_ROW_BYTES, 1)
+        parallel = fans_out(self, len(self._store))
+        if parallel:
+            # a few ranges per worker; ranges in flight at once share the memory budget
+            jobs = effective_jobs(self.n_jobs)
+            share = -(-self._store.n_rows // (4 * jobs))
+            max_rows = max(min(share, max_rows // jobs) if max_rows else share, 1)
+        ranges = self._store.group_ranges(max_rows)
+        with self._profiler.stage('lifts', self._store.n_rows):
+            parts = self._map_ranges('_range_lift_stats', ranges, parallel)
+            stats = parts[0] if len(parts) == 1 else concat_lift_stats(parts, [lo for lo, _ in ranges])
+            table, events = self._lift_arrays(stats)
+        with self._profiler.stage('period_tables', self._store.n_rows):
+            parts = self._map_ranges('_range_period_tables', ranges, parallel)
+            tables = parts[0] if len(parts) == 1 else {f: concat_period_tables([p[f] for p in parts]) for f in TABLE_KEYS}
+            self._split_tables(tables)
+        return stats, table, events, tables
+
+    def _map_ranges(self, method, ranges, parallel=False):
+        if parallel:
+            return parallel_ranges(self, method, ranges)
+        return [getattr(self, method)(lo, hi) for lo, hi in ranges]
+
+    def _range_columns(self, lo, hi):
+        # store columns and group codes (relative to lo) of groups lo..hi-1
+        a, b = self._store.offsets[lo], self._store.offsets[hi]
+        codes = np.repeat(np.arange(hi - lo), np.diff(self._store.offsets[lo:hi + 1]))
+        return {c: v[a:b] for c, v in self._store.columns.items()}, codes
+
+    def _range_lift_stats(self, lo, hi):
+        cols, codes = self._range_columns(lo, hi)
+        return batch_lift_stats(codes, hi - lo, cols['target'], cols.get('promo'), cols.get('discount'), cols.get('event'))
+
+    def _range_period_tables(self, lo, hi):
+        cols, codes = self._range_columns(lo, hi)
+        return self._period_tables(cols, codes, hi - lo)
+
+    def _period_tables(self, cols, codes, n_groups):
+        days = day_numbers(cols['date'])
+        cal = self._calendar(days)
+        return {f: batch_period_tables(codes, cal.take(column, days), cols['target'], n_groups)
+                for f, column in TABLE_KEYS.items()}
+
+    def _lift_arrays(self, stats):
+        # lift_table as plain arrays: states look them up once per group
+        table, events = lift_table(stats, self._store.event_names)
+        return {c: table[c].to_numpy() for c in table.columns}, {c: events[c].to_numpy() for c in events.columns}
+
+    def _build_state(self, g, batch):
+        """Fitted state of group code g; `batch` is the output of _batch_summaries."""
+        cols = self._store.group(g)
+        return self._batch_state(g, g, batch, recent_tail(cols['date'], cols['target'], 14), self._store.keys[g])
+
+    def _batch_state(self, g, i, batch, recent, key=None):
+        # state of group code g from row i of a (stats, table, events, tables) batch
+        stats, table, events, tables = batch
+        summ = {'recent': recent, 'lift_stats': slice_lift_stats(stats, i)}
+        for f in TABLE_KEYS:
+            summ[f] = slice_period_table(tables[f], i)
+            if f in _SEASONS:
+                lo, hi = tables[f]['offsets'][i:i + 2]
+                summ[f].update(season=tables[f]['season'][lo:hi], parts=slice_seasonal_split(tables[f]['split'], i))
+        lo, hi = np.searchsorted(events['group'], [i, i + 1])
+        lifts = EmpiricalLifts.from_params(table['promo_lift'][i], table['discount_beta'][i],
+                                           dict(zip(events['event_name'][lo:hi], events['lift'][lo:hi])))
+        return self._finalize_state(g, summ, lifts, key)
+
+    def _append_history(self, rows):
+        """Incrementally extend the fitted state with new (merged) history rows.
+        The rows are spliced into the store, and the lift statistics and period tables
+        of the groups they touch are computed from them in one vectorized pass each,
+        then merged with the fitted ones (empty for groups seen for the first time),
+        so the cost follows the new rows rather than the history.
+        """
+        delta = self._make_store(rows, keys=self._store.keys, event_names=self._store.event_names)
+        self._store = self._store.append(delta)
+        counts = np.diff(delta.offsets)
+        touched = np.flatnonzero(counts)
+        # delta rows come in group order: batch row i holds group touched[i]
+        codes = np.repeat(np.arange(len(touched)), counts[touched])
+        keys = [delta.keys[g] for g in touched]
+        states = [self._group_state.get(k) for k in keys]
+        cols = delta.columns
+        with self._profiler.stage('lifts', delta.n_rows):
+            stats = batch_lift_stats(codes, len(touched), cols['target'], cols.get('promo'), cols.get('discount'),
+                                     cols.get('event'))
+            if keys:
+                none = lift_stats(np.zeros(0))
+                fitted = concat_lift_stats([s['lift_stats'] if s else none for s in states], range(len(keys)))
+                stats = merge_lift_stats(fitted, stats)
+            table, events = self._lift_arrays(stats)
+        with self._profiler.stage('period_tables', delta.n_rows):
+            tables = self._period_tables(cols, codes, len(touched))
+            if keys:
+                none = {'start': np.zeros(0, dtype='datetime64[ns]'), 'sum': np.zeros(0), 'count': np.zeros(0, dtype=np.int64)}
+                tables = {f: merge_period_tables(stack_period_tables([s[f] if s else none for s in states]), t)
+                          for f, t in tables.items()}
+            self._split_tables(tables)
+        batch = (stats, table, events, tables)
+        for i, (g, key, state) in enumerate(zip(touched, keys, states)):
+            new = delta.group(g)
+            dates, values = new['date'], new['target']
+            if state is not None:
+                dates, values = np.concatenate([state['recent'][0], dates]), np.concatenate([state['recent'][1], values])
+            self._group_state[key] = self._batch_state(g, i, batch, recent_tail(dates, values, 14), key)
+
+    def _explode_events(self, events_df):
+        # fit() and forecast() usually get the same events frame: explode it once
+        if events_df is None:
+            return None
+        key = (frame_fingerprint(events_df), tuple(self.attributes), self.event_lag_days)
+        if self._events_cache is None or self._events_cache[0] != key:
+            with self._profiler.stage('explode_events', len(events_df)):
+                daily = explode_events(events_df, attributes=self.attributes, lag_days=self.event_lag_days)
+            self._events_cache = (key, daily)
+        return self._events_cache[1]
+
+    def _make_store(self, df, keys=None, event_names=None):
+        with self._profiler.stage('build_store', len(df)):
+            return GroupStore.from_frame(df, self.attributes, date_col=self.date_col, target_col=self.target_col,
+                                         promo_col=self.promo_col, discount_col=self.discount_col,
+                                         event_name_col=self.event_name_col, keys=keys, event_names=event_names,
+                                         compact=self.compact, max_bytes=self._store_budget())
+
+    def _store_budget(self):
+        # half of max_memory for the store's arrays, the rest for per-range fit temporaries
+        budget = parse_memory(self.max_memory)
+        return budget and budget // 2
+
+    def _prepare_sales(self, sales_df):
+        # compact mode: no deep copy, categorical keys and float32 sales/discounts
+        sales_df = ensure_datetime(sales_df, self.date_col, copy=not self.compact)
+        if self.compact:
+            sales_df = compact_frame(sales_df, self.attributes, (self.target_col, self.discount_col))
+        return sales_df
+
+    def _merge_events(self, sales_df):
+        with self._profiler.stage('safe_merge_events', len(sales_df)):
+            return safe_merge_events(sales_df, self._events_daily, self.attributes, copy=not self.compact)
+
+    def _horizon_keys(self, horizon_dates):
+        """Table key (datetime64[ns]) and season of every horizon date, looked up in the
+        calendar: D: the day and its weekday, W: week start and week-of-month, M: month
+        start and calendar month."""
+        days = day_numbers(horizon_dates)
+        cal = self._calendar(days)
+        column, season = {'D': (None, 'dow'), 'W': ('week', 'week_of_month'), 'M': ('month_start', 'month')}[self.horizon_freq]
+        return to_datetimes(days if column is None else cal.take(column, days)), cal.take(season, days)
+
+    def _baseline(self, state, horizon_keys, lookback_n):
+        """Score every horizon date against the fitted tables of one group.
+        D: same weekday, W: same week-of-month, M: same calendar month; NaN falls
+        back to the recent average (last 14 days / last 6 periods).
+        `horizon_keys` is the output of _horizon_keys.
+        """
+        keys, season = horizon_keys
+        freq = self.horizon_freq
+        tables = state[freq]
+        parts = self._store.dow_parts(state['code']) if freq == 'D' else tables['parts']
+        base = seasonal_baseline(parts, keys, season, lookback_n, self.method)
+        return np.where(np.isnan(base), tables['recent_mean'], base)
 
     # ----------------- API -----------------
-    def fit(self, sales_df, events_df=None):
-        sales_df = ensure_datetime(sales_df, self.date_col)
-        self._events_daily = explode_events(events_df, attributes=self.attributes, lag_days=self.event_lag_days) if events_df is not None else None
-        merged = safe_merge_events(sales_df, self._events_daily, self.attributes)
-        self._group_state = {}
-        if self.attributes:
-            groups = list(merged.groupby(self.attributes))
+    def fit(self, sales_df, events_df=None, lazy=False):
+        """Fit on the sales history. lazy=True runs only the vectorized passes over all
+        groups and builds each group's state on first use (e.g. for forecasts served
+        mostly from a ForecastCache)."""
+        self._profiler = self._profiler.fresh()
+        sales_df = self._prepare_sales(sales_df)
+        self._events_daily = self._explode_events(events_df)
+        merged = self._merge_events(sales_df)
+        self._store = self._make_store(merged)
+        return self._fit_store(lazy)
+
+    def fit_chunks(self, chunks, events_df=None, lazy=False):
+        """fit() on sales delivered as an iterable of frames (e.g. a chunked CSV reader).
+        Each chunk is merged with the events and encoded straight into the group store,
+        so the full sales frame is never materialized.
+        """
+        self._profiler = self._profiler.fresh()
+        self._events_daily = self._explode_events(events_df)
+        merged = (self._merge_events(self._prepare_sales(c)) for c in chunks)
+        # build_store also covers reading the chunks
+        with self._profiler.stage('build_store'):
+            self._store = GroupStore.from_chunks(merged, self.attributes, date_col=self.date_col, target_col=self.target_col,
+                                                 promo_col=self.promo_col, discount_col=self.discount_col,
+                                                 event_name_col=self.event_name_col, compact=self.compact,
+                                                 max_bytes=self._store_budget())
+        return self._fit_store(lazy)
+
+    def _fit_store(self, lazy=False):
+        self._lookbacks()
+        batch = self._batch_summaries()
+        if lazy:
+            self._group_state = LazyStates(self, batch, self._store.keys)
         else:
-            groups = [(tuple(), merged)]
-        for keys, grp in groups:
-            key_tuple = keys if isinstance(keys, tuple) else (keys,)
-            self._group_state[key_tuple] = {
-                'hist': grp.sort_values(self.date_col).copy(),
-                'lifts': EmpiricalLifts(grp.rename(columns={self.target_col:'sales'}), target_col='sales',
-                                        promo_col=self.promo_col, discount_col=self.discount_col, event_name_col=self.event_name_col)
-            }
+            self._group_state = {key: self._build_state(g, batch) for g, key in enumerate(self._store.keys)}
         self._fitted = True
         return self
 
-    def forecast(self, horizon_dates=None, horizon_start=None, horizon_periods=None, future_plan=None, future_events=None):
+    def partial_fit(self, new_sales_df, new_events_df=None):
+        """Append new sales rows (e.g. the latest day) without refitting the history.
+        Existing groups are updated from the delta only (period tables, trends and the
+        promo/discount/event sufficient statistics); unseen groups are added. The result
+        equals fit() on the concatenated sales, provided new events only cover the new
+        rows' dates (already-fitted rows are not re-merged with events).
+        """
+        if not self._fitted:
+            return self.fit(new_sales_df, events_df=new_events_df)
+        new_sales_df = self._prepare_sales(new_sales_df)
+        if new_events_df is not None:
+            new_daily = explode_events(new_events_df, attributes=self.attributes, lag_days=self.event_lag_days)
+            if self._events_daily is not None and len(self._events_daily) > 0:
+                new_daily = pd.concat([self._events_daily, new_daily], ignore_index=True)
+            self._events_daily = new_daily
+        merged = self._merge_events(new_sales_df)
+        self._append_history(merged)
+        return self
+
+    def save(self, path):
+        """Save the fitted model to directory `path` (NumPy arrays plus manifest.json)."""
+        assert self._fitted, "Call fit() first"
+        save_model(self, path)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True, **params):
+        """Load a model written by save(). With mmap=True the arrays are memory-mapped
+        read-only, so loading is near instant and processes share pages. `params`
+        override saved constructor arguments (e.g. n_jobs, profile)."""
+        return load_model(cls, path, mmap=mmap, **params)
+
+    @property
+    def profile_(self):
+        """Per-stage timings of the last fit() and the forecasts since (needs profile=...):
+        {stage: {'seconds', 'calls', 'rows', 'slowest_groups'}}."""
+        return self._profiler.report(lambda key: dict(zip(self.attributes, key)))
+
+    @property
+    def lift_table_(self):
+        """Fitted promo lift and discount beta per group."""
+        assert self._fitted, "Call fit() first"
+        rows = [dict(zip(self.attributes, key), promo_lift=state['lifts']._promo_lift,
+                     discount_beta=state['lifts']._discount_beta) for key, state in self._group_state.items()]
+        return pd.DataFrame(rows, columns=self.attributes + ['promo_lift', 'discount_beta'])
+
+    @property
+    def trend_components_(self):
+        """Cached trend components per group (weekly/monthly/yearly change and resulting factor)."""
+        assert self._fitted, "Call fit() first"
+        rows = []
+        for key, state in self._group_state.items():
+            row = dict(zip(self.attributes, key))
+            row.update(state['trend'])
+            row['trend_factor'] = state['trend_factor']
+            rows.append(row)
+        return pd.DataFrame(rows, columns=self.attributes + [name for name, _ in TREND_LEVELS] + ['trend_factor'])
+
+    def _prepare_forecast(self, horizon_dates, horizon_start, horizon_periods, future_plan, future_events, keys=None):
+        horizon_dates = self._horizon_dates(horizon_dates, horizon_start, horizon_periods)
+        return horizon_dates, self._forecast_grid(horizon_dates, future_plan, self._explode_events(future_events), keys)
+
+    def _horizon_dates(self, horizon_dates, horizon_start, horizon_periods):
         assert self._fitted, "Call fit() first"
         # build horizon index
         if horizon_dates is None:
@@ -138,98 +413,291 @@ class AttributeAwareForecaster:
             start = pd.Timestamp(horizon_start)
             if self.horizon_freq == 'D':
                 horizon_dates = pd.date_range(start, periods=int(horizon_periods), freq='D')
-            elif self.horizon_freq == 'W':
-                s = period_start(start, 'W', self.week_start)
-                horizon_dates = pd.date_range(s, periods=int(horizon_periods), freq=f'W-{self.week_start}')
-            elif self.horizon_freq == 'M':
-                s = period_start(start, 'M')
-                horizon_dates = pd.date_range(s, periods=int(horizon_periods), freq='MS')
+            elif self.horizon_freq in ('W', 'M'):
+                day = day_numbers([start])
+                column, alias = ('week', f'W-{self.week_start}') if self.horizon_freq == 'W' else ('month_start', 'MS')
+                s = to_datetimes(self._calendar(day).take(column, day))[0]
+                horizon_dates = pd.date_range(s, periods=int(horizon_periods), freq=alias)
             else:
                 raise ValueError("Unsupported horizon_freq")
-        horizon_dates = pd.to_datetime(horizon_dates)
+        return pd.to_datetime(horizon_dates)
 
-        # prepare future plans & events per group
+    def _forecast_grid(self, horizon_dates, future_plan, future_events_daily, keys=None):
+        """_horizon_grid of every group, or of just `keys`, from already exploded events."""
+        self._cache_stats = {'hits': 0, 'misses': 0}
+        self._lookbacks()  # compiled once here rather than in every worker
+        codes = None if keys is None else np.unique([self._store.key_index[k] for k in keys]).astype(np.int64)
+        n_groups = len(self._group_state) if codes is None else len(codes)
+        # resolve future plans & events for every (group, horizon date) in one join each
+        with self._profiler.stage('horizon_grid', n_groups * len(horizon_dates)):
+            return self._horizon_grid(horizon_dates, self._plan_frame(future_plan), future_events_daily, codes)
+
+    def _plan_frame(self, future_plan):
         if future_plan is not None and len(future_plan)>0:
             future_plan = future_plan.copy()
             future_plan[self.date_col] = pd.to_datetime(future_plan[self.date_col])
-        future_events_daily = explode_events(future_events, attributes=self.attributes, lag_days=self.event_lag_days) if future_events is not None else None
+        return future_plan
+
+    def _forecast_frame(self, cols):
+        with self._profiler.stage('output', len(cols.get('date', ()))):
+            return pd.DataFrame(cols).sort_values(self.attributes + ['date'] if self.attributes else ['date']).reset_index(drop=True)
 
+    def forecast(self, horizon_dates=None, horizon_start=None, horizon_periods=None, future_plan=None, future_events=None,
+                 cache=None):
+        """Forecast every group. With a ForecastCache, groups whose inputs are unchanged
+        since a cached run are served from it and only the others are computed (see
+        cache_stats_)."""
+        horizon_dates, grid = self._prepare_forecast(horizon_dates, horizon_start, horizon_periods, future_plan, future_events)
+        return self._forecast_frame(self._forecast_keys(list(self._group_state), horizon_dates, grid, cache))
+
+    def _forecast_keys(self, keys, horizon_dates, grid, cache=None):
+        """_forecast_groups for `keys`, across worker processes when n_jobs > 1."""
+        if cache is not None:
+            return self._cached_keys(keys, horizon_dates, grid, cache)
+        if fans_out(self, len(keys)):
+            parts = parallel_forecast_blocks(self, keys, horizon_dates, grid)
+        else:
+            parts = [self._forecast_groups(keys, horizon_dates, grid)]
+        return {c: np.concatenate([p[c] for p in parts]) for c in parts[0]} if parts else {}
+
+    def _cached_keys(self, keys, horizon_dates, grid, cache):
+        """_forecast_keys through `cache`: fingerprint every group, reuse the forecast and
+        trend factor of cached ones, compute and store the rest."""
+        n_dates = len(horizon_dates)
+        with self._profiler.stage('cache', len(keys)):
+            fps = group_fingerprints(self, keys, horizon_dates, grid)
+            hits = cache.get_many(fps)
+        miss = [i for i, fp in enumerate(fps) if fp not in hits]
+        fresh = self._forecast_keys([keys[i] for i in miss], horizon_dates, grid)
+        values = fresh['forecast'].reshape(len(miss), n_dates)
+        tf_fresh = fresh['trend_factor'][::n_dates] if n_dates else np.ones(len(miss))
+        with self._profiler.stage('cache', len(miss)):
+            cache.put_many({fps[i]: (values[j], tf_fresh[j]) for j, i in enumerate(miss)})
+        self._cache_stats['hits'] += len(keys) - len(miss)
+        self._cache_stats['misses'] += len(miss)
+        # cached rows are final forecasts: reassemble the columns with a unit lift factor
+        base, tfs = np.empty((len(keys), n_dates)), np.empty(len(keys))
+        for i, fp in enumerate(fps):
+            if fp in hits:
+                base[i], tfs[i] = hits[fp]
+        base[miss], tfs[miss] = values, tf_fresh
+        return self._forecast_columns(keys, horizon_dates, base, tfs, np.ones_like(base), grid)
+
+    @property
+    def cache_stats_(self):
+        """Groups served from / missing in the ForecastCache by the last forecast: {'hits', 'misses', 'hit_rate'}."""
+        total = self._cache_stats['hits'] + self._cache_stats['misses']
+        return dict(self._cache_stats, hit_rate=self._cache_stats['hits'] / total if total else 0.0)
+
+    def forecast_batches(self, horizon_dates=None, horizon_start=None, horizon_periods=None, future_plan=None,
+                         future_events=None, batch_groups=1000, cache=None, groups=None):
+        """Yield the forecast as DataFrames of up to `batch_groups` groups each, in sorted
+        group order, so callers can write rows out as groups finish. Concatenated, the
+        batches equal forecast() (restricted to the keys in `groups`, if given); `cache`
+        is used as there.
+        """
+        horizon_dates, grid = self._prepare_forecast(horizon_dates, horizon_start, horizon_periods, future_plan, future_events)
+        keys = sorted(self._group_state if groups is None else set(groups))
+        # no groups (e.g. an empty shard) still yields one empty frame with the output columns
+        batches = [keys[i:i + batch_groups] for i in range(0, len(keys), max(int(batch_groups), 1))] or [[]]
+        if cache is not None:
+            blocks = (self._forecast_keys(b, horizon_dates, grid, cache) for b in batches)
+        elif fans_out(self, len(keys)) and len(batches) > 1:
+            blocks = iter_forecast_blocks(self, batches, horizon_dates, grid)
+        else:
+            blocks = (self._forecast_groups(b, horizon_dates, grid) for b in batches)
+        for cols in blocks:
+            yield self._forecast_frame(cols)
+
+    def forecast_scenarios(self, horizon_dates=None, horizon_start=None, horizon_periods=None, plans=None,
+                           future_events=None):
+        """Forecast one horizon under several promo/discount plans ({name: future_plan_df}).
+        Baseline x trend is computed once per group and date; each scenario only adds its
+        plan join and a vectorized lift multiply. Returns the forecast() columns of every
+        scenario, stacked in `plans` order behind a leading `scenario` column.
+        """
+        horizon_dates, grid = self._prepare_forecast(horizon_dates, horizon_start, horizon_periods, None, future_events)
+        keys = sorted(self._group_state)
+        if fans_out(self, len(keys)):
+            base_trend, tfs = parallel_base_trend(self, keys, horizon_dates)
+        else:
+            base_trend, tfs = self._base_trend(keys, horizon_dates)
+        frames = []
+        for name, plan in (plans or {}).items():
+            with self._profiler.stage('horizon_grid', len(keys) * len(horizon_dates)):
+                plan_grid = self._horizon_grid(horizon_dates, self._plan_frame(plan), None)
+            scenario = dict(grid, promo_flag=plan_grid['promo_flag'], discount=plan_grid['discount'])
+            cols = self._forecast_columns(keys, horizon_dates, base_trend, tfs, self._lift_factors(keys, scenario), scenario)
+            frame = self._forecast_frame(cols)
+            frame.insert(0, 'scenario', name)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['scenario'])
+
+    def backtest(self, cutoffs, horizon_periods, lookbacks=(4, 6, 8, 12), methods=('wma', 'median'), freqs=None):
+        """Rolling-origin backtest of the seasonal baseline on the fitted history.
+
+        For every cutoff, group, method and lookback N the baseline is scored as a fit
+        on the history before the cutoff would score it (W/M cutoffs snap to the start
+        of their period, as horizon_start does) and compared with the actual sums over
+        the next `horizon_periods` periods. All cutoffs and N share one window pass per
+        group. Trend and lift factors are left
+        out, as lookback and method only change the baseline. Returns one row per group,
+        horizon_freq, method and lookback with the error sums, wape, bias
+        (signed WAPE) and mae.
+        """
+        assert self._fitted, "Call fit() first"
+        freqs = list(freqs or [self.horizon_freq])
+        keys = list(self._group_state)
+        args = (pd.DatetimeIndex(pd.to_datetime(cutoffs)), horizon_periods, list(lookbacks), list(methods), freqs)
+        if fans_out(self, len(keys)):
+            rows = parallel_backtest(self, keys, *args)
+        else:
+            rows = self._backtest_groups(keys, *args)
+        columns = self.attributes + ['horizon_freq', 'method', 'lookback'] + list(SUMS)
+        return add_metrics(pd.DataFrame(rows, columns=columns))
+
+    def _backtest_groups(self, keys, cutoffs, horizon_periods, lookbacks, methods, freqs):
+        days = day_numbers(cutoffs)
+        cal = self._calendar([days.min(), days.max() + 32 * (int(horizon_periods) + 1)]) if len(days) else self._calendar(days)
+        targets = {f: backtest_targets(cutoffs, f, horizon_periods, cal) for f in freqs}
+        partials = {f: self._partial_periods(targets[f][0], f) for f in freqs if f != 'D'}
         rows = []
-        for key, state in self._group_state.items():
-            hist = state['hist']
-            lifts = state['lifts']
-            # subgroup future plan/events
-            gp_plan = None
-            if future_plan is not None and len(future_plan)>0:
-                cond = pd.Series(True, index=future_plan.index)
-                for i, a in enumerate(self.attributes):
-                    cond &= (future_plan[a] == key[i])
-                gp_plan = future_plan[cond].copy()
-            gp_events = None
-            if future_events_daily is not None and len(future_events_daily)>0:
-                cond = pd.Series(True, index=future_events_daily.index)
-                for i, a in enumerate(self.attributes):
-                    if a in future_events_daily.columns:
-                        cond &= (future_events_daily[a] == key[i])
-                gp_events = future_events_daily[cond].copy()
-
-            lookback_map = self._resolve_lookback(key)
-            look_n = lookback_map.get(self.horizon_freq, 8)
-
-            for dt in horizon_dates:
-                # baseline
-                if self.horizon_freq == 'D':
-                    base = self._baseline_daily(hist, dt, look_n)
-                elif self.horizon_freq == 'W':
-                    base = self._baseline_weekly(hist, dt, look_n)
-                else:
-                    base = self._baseline_monthly(hist, dt, look_n)
-
-                if pd.isna(base):
-                    # fallback recent average
-                    if self.horizon_freq == 'D':
-                        base = hist[self.target_col].tail(14).mean()
-                    elif self.horizon_freq == 'W':
-                        tmp = hist.copy(); tmp['p'] = tmp[self.date_col].dt.to_period(f'W-{self.week_start}').dt.start_time
-                        w = tmp.groupby('p', as_index=False)[self.target_col].sum()
-                        base = w[self.target_col].tail(6).mean() if len(w)>0 else 0.0
+        for key in keys:
+            state = self._group_state[key]
+            cols = self._store.group(state['code'])
+            with self._profiler.stage('backtest', len(cols['date']), key):
+                for f in freqs:
+                    if f == 'D':
+                        parts = self._store.dow_parts(state['code'])
+                        order = np.argsort(cols['date'], kind='stable')
+                        recent = (cols['date'][order], cols['target'][order], 14, True)
                     else:
-                        tmp = hist.copy(); tmp['p'] = tmp[self.date_col].dt.to_period('M').dt.start_time
-                        m = tmp.groupby('p', as_index=False)[self.target_col].sum()
-                        base = m[self.target_col].tail(6).mean() if len(m)>0 else 0.0
-
-                # trend
-                tf = self._trend_factor(hist, dt) if self.use_trends else 1.0
-
-                # planned promo/discount
-                promo_flag = 0
-                discount = 0.0
-                if gp_plan is not None and len(gp_plan)>0:
-                    r = gp_plan.loc[gp_plan[self.date_col] == dt]
-                    if len(r)>0:
-                        promo_flag = int(r.iloc[0][self.promo_col]) if self.promo_col in r.columns else 0
-                        discount = float(r.iloc[0][self.discount_col]) if self.discount_col in r.columns else 0.0
-
-                # planned event
-                event_name = None
-                if gp_events is not None and len(gp_events)>0:
-                    ev = gp_events.loc[gp_events['date'] == dt]
-                    if len(ev)>0:
-                        event_name = ev.iloc[0].get('event_name', None)
-
-                # lifts
-                factor = 1.0
-                if self.use_promotions or self.use_events:
-                    factor = lifts.lift_for(promo_flag=promo_flag if self.use_promotions else 0,
-                                            discount_val=discount if self.use_promotions else 0.0,
-                                            event_name=event_name if self.use_events else None)
-                yhat = max(0.0, float(base * tf * factor))
-
-                row = {'date': dt, 'forecast': yhat, 'trend_factor': float(tf),
-                       'promo_flag': promo_flag, 'discount': discount, 'event_name': event_name}
-                for i, a in enumerate(self.attributes):
-                    row[a] = key[i]
-                rows.append(row)
-
-        out = pd.DataFrame(rows).sort_values(self.attributes + ['date'] if self.attributes else ['date']).reset_index(drop=True)
+                        # a period is usable once its last day is before the cutoff
+                        table = state[f]
+                        last = to_datetimes(cal.period_end(TABLE_KEYS[f], day_numbers(table['start'])))
+                        parts = seasonal_split(last, table['sum'], table['season'])
+                        recent = (last, table['sum'], 6, False)
+                    res = backtest_group(cols['date'], cols['target'], parts, recent, targets[f], lookbacks, methods,
+                                         partials.get(f))
+                    rows += [list(key) + [f, m, n] + [r[c] for c in SUMS] for (m, n), r in res.items()]
+        return rows
+
+    def _partial_periods(self, limit, freq):
+        """(start, season) of the table period each cutoff falls inside of (start = cutoff
+        when the cutoff is a period boundary, i.e. there is no partial period)."""
+        limit = day_numbers(limit)
+        cal = self._calendar(limit - 1)
+        column = TABLE_KEYS[freq]
+        start = np.where(cal.period_end(column, limit - 1) >= limit, cal.take(column, limit - 1), limit)
+        return to_datetimes(start), cal.take('week_of_month' if freq == 'W' else 'month', start)
+
+    def best_lookback_config(self, results, level=None, metric='wape', method=None):
+        """Best-scoring lookbacks of backtest() `results` as a lookback_config dict in the
+        `_resolve_lookback` format: 'default' pools every group, plus an entry for each
+        prefix of the first `level` attributes (default: all) whose best differs.
+        metric: 'wape' or 'mae'; method defaults to the model's.
+        """
+        res = results[results['method'] == (method or self.method)]
+        level = len(self.attributes) if level is None else level
+        default = dict(self.lookback_config.get('default', DEFAULT_LOOKBACK))
+        default.update({f: n for (f, _), n in best_lookbacks(res, self.attributes, 0, metric).items()})
+        config = {'default': default}
+        if level:
+            per = {}
+            for (f, prefix), n in best_lookbacks(res, self.attributes, level, metric).items():
+                per.setdefault(prefix, dict(default))[f] = n
+            config.update({prefix: v for prefix, v in per.items() if v != default})
+        return config
+
+    def _match_grid(self, frame, date_col, on, dates, codes=None):
+        """Join `frame` to the fitted groups (those of `codes`, if given) on the `on`
+        attributes and to the unique horizon `dates`; returns (grid row, date position,
+        frame row) for the first frame row of every matched (group, date) pair.
+        """
+        store_keys = self._store.keys if codes is None else [self._store.keys[g] for g in codes]
+        keys = pd.DataFrame(store_keys, columns=self.attributes)
+        keys['_code'] = np.arange(len(keys))
+        f = frame[on + [date_col]].assign(_row=np.arange(len(frame)))
+        for c in on:
+            # e.g. a plan with int store ids against text ones: join on the store's types,
+            # or as plain objects (matching nothing) when the values don't convert
+            if f[c].dtype != keys[c].dtype:
+                try:
+                    f[c] = f[c].astype(keys[c].dtype)
+                except (TypeError, ValueError):
+                    f[c], keys[c] = f[c].astype(object), keys[c].astype(object)
+        m = f.merge(keys[on + ['_code']], on=on, how='inner') if on else f.merge(keys[['_code']], how='cross')
+        m['_pos'] = dates.get_indexer(pd.DatetimeIndex(m[date_col]))
+        m = m[m['_pos'] >= 0].sort_values('_row', kind='stable').drop_duplicates(['_code', '_pos'])
+        return m['_code'].to_numpy(), m['_pos'].to_numpy(), m['_row'].to_numpy()
+
+    def _horizon_grid(self, horizon_dates, future_plan, future_events_daily, codes=None):
+        """Planned promo flag, discount and event code for every (group code, horizon date).
+        With `codes` (sorted group codes) the grid only has rows for those groups; look
+        rows up with _grid_rows."""
+        dates, inverse = np.unique(horizon_dates.values, return_inverse=True)
+        dates = pd.DatetimeIndex(dates)
+        shape = (len(self._store) if codes is None else len(codes), len(dates))
+        promo, discount, event = np.zeros(shape, dtype=np.int64), np.zeros(shape), np.full(shape, -1)
+        names = []
+        if future_plan is not None and len(future_plan)>0:
+            code, pos, row = self._match_grid(future_plan, self.date_col, self.attributes, dates, codes)
+            if self.promo_col in future_plan.columns:
+                promo[code, pos] = future_plan[self.promo_col].fillna(0).to_numpy()[row].astype(np.int64)
+            if self.discount_col in future_plan.columns:
+                discount[code, pos] = future_plan[self.discount_col].to_numpy(dtype=float)[row]
+        if future_events_daily is not None and len(future_events_daily)>0:
+            on = [a for a in self.attributes if a in future_events_daily.columns]
+            code, pos, row = self._match_grid(future_events_daily, 'date', on, dates, codes)
+            ev_codes, names = pd.factorize(future_events_daily['event_name'])
+            event[code, pos] = ev_codes[row]
+        return {'promo_flag': promo[:, inverse], 'discount': discount[:, inverse],
+                'event_code': event[:, inverse], 'event_names': np.asarray(names, dtype=object), 'codes': codes}
+
+    def _grid_rows(self, grid, codes):
+        # rows of `grid` holding group codes `codes`
+        return codes if grid['codes'] is None else np.searchsorted(grid['codes'], codes)
+
+    def _base_trend(self, keys, horizon_dates):
+        """Baseline x trend factor (len(keys) x horizon) and the trend factors, for `keys`."""
+        n_dates = len(horizon_dates)
+        out, tfs = np.empty((len(keys), n_dates)), np.empty(len(keys))
+        horizon_keys = self._horizon_keys(horizon_dates)
+        lookbacks = self._lookbacks()[1][self.horizon_freq]
+        for i, key in enumerate(keys):
+            state = self._group_state[key]
+            with self._profiler.stage('baselines', n_dates, key):
+                base = self._baseline(state, horizon_keys, int(lookbacks[state['code']]))
+            tfs[i] = state['trend_factor'] if self.use_trends else 1.0
+            out[i] = base * tfs[i]
+        return out, tfs
+
+    def _lift_factors(self, keys, grid):
+        """Promo/discount/event lift of every (key, horizon date) under `grid`."""
+        codes = self._grid_rows(grid, np.array([self._group_state[k]['code'] for k in keys], dtype=np.int64))
+        with self._profiler.stage('apply_lifts', len(keys) * grid['promo_flag'].shape[1]):
+            return batch_lift_factors([self._group_state[k]['lifts'] for k in keys], grid['promo_flag'][codes],
+                                      grid['discount'][codes], grid['event_code'][codes], grid['event_names'],
+                                      promotions=self.use_promotions, events=self.use_events)
+
+    def _forecast_columns(self, keys, horizon_dates, base_trend, tfs, factor, grid):
+        """Forecast columns (aligned arrays) for `keys`, in key order then horizon order."""
+        n_dates = len(horizon_dates)
+        names = grid['event_names']
+        codes = self._grid_rows(grid, np.array([self._store.key_index[k] for k in keys], dtype=np.int64))
+        yhat = (base_trend * factor).ravel()
+        event_code = grid['event_code'][codes].ravel()
+        out = {'date': np.tile(horizon_dates.values, len(keys)),
+               'forecast': np.where(yhat > 0.0, yhat, 0.0),
+               'trend_factor': np.repeat(tfs, n_dates),
+               'promo_flag': grid['promo_flag'][codes].ravel(),
+               'discount': grid['discount'][codes].ravel(),
+               'event_name': np.where(event_code >= 0, names[np.clip(event_code, 0, None)] if len(names) else None, None)}
+        for i, a in enumerate(self.attributes):
+            out[a] = np.repeat(np.array([k[i] for k in keys], dtype=object), n_dates)
         return out
+
+    def _forecast_groups(self, keys, horizon_dates, grid):
+        """Forecast columns (aligned arrays) for `keys`, in key order then horizon order."""
+        base_trend, tfs = self._base_trend(keys, horizon_dates)
+        return self._forecast_columns(keys, horizon_dates, base_trend, tfs, self._lift_factors(keys, grid), grid)
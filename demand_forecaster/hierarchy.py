@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from .forecaster import AttributeAwareForecaster
+from .utils import ensure_datetime
+
+RECONCILE = (None, 'bottom_up', 'proportional')
+
+# ---- helpers ----
+def level_map(keys, positions):
+    """Project bottom keys onto the attributes at `positions`: (sorted level keys,
+    level code of every bottom key)."""
+    projected = [tuple(k[i] for i in positions) for k in keys]
+    level_keys = sorted(set(projected))
+    index = {k: i for i, k in enumerate(level_keys)}
+    return level_keys, np.array([index[k] for k in projected], dtype=np.int64)
+
+def level_sums(matrix, group_map, n_groups):
+    """Sum the rows of a (bottom groups x dates) matrix into their level groups."""
+    out = np.zeros((n_groups, matrix.shape[1]))
+    np.add.at(out, group_map, matrix)
+    return out
+
+def level_name(level):
+    return ','.join(level) if level else 'total'
+
+class HierarchicalForecaster:
+    """Forecasts every level of an ordered attribute hierarchy from one base store.
+
+    Sales are merged and encoded once at the bottom level (all `hierarchy`
+    attributes); every level in `levels` (attribute subsets, default: the prefixes
+    of the hierarchy, top to bottom) is rolled up from that store by summing its
+    children per date and fitted as an AttributeAwareForecaster. Level series are
+    totals, so `reconcile` can make them add up: 'bottom_up' replaces every level by
+    the sum of its bottom forecasts, 'proportional' splits the top (coarsest) level
+    over the bottom in proportion to the bottom forecasts and sums back up.
+    Other keyword arguments are passed to every level's AttributeAwareForecaster.
+    """
+    def __init__(self, hierarchy, levels=None, reconcile=None, **params):
+        if reconcile not in RECONCILE:
+            raise ValueError(f"reconcile must be one of {RECONCILE}")
+        self.hierarchy = list(hierarchy)
+        self.levels = [list(l) for l in levels] if levels is not None else [self.hierarchy[:i + 1] for i in range(len(self.hierarchy))]
+        for level in self.levels:
+            if not set(level) <= set(self.hierarchy):
+                raise ValueError(f"Level {level} is not a subset of the hierarchy {self.hierarchy}")
+        self.reconcile = reconcile
+        self.params = params
+        self.models = {}
+        self._maps = {}
+        self._fitted = False
+
+    def fit(self, sales_df, events_df=None):
+        base = AttributeAwareForecaster(attributes=self.hierarchy, **self.params)
+        sales_df = ensure_datetime(sales_df, base.date_col)
+        base._events_daily = base._explode_events(events_df)
+        store = base._make_store(base._merge_events(sales_df))
+        self.models, self._maps = {}, {}
+        for level in self.levels:
+            keys, group_map = level_map(store.keys, [self.hierarchy.index(a) for a in level])
+            model = AttributeAwareForecaster(attributes=level, **self.params)
+            model._events_daily, model._events_cache = base._events_daily, base._events_cache
+            model._store = store.rollup(group_map, keys)
+            model._fit_store()
+            self.models[tuple(level)] = model
+            self._maps[tuple(level)] = group_map
+        self._fitted = True
+        return self
+
+    def _level_plan(self, future_plan, level, model):
+        # roll the (bottom level) plan up like the history: any promo, mean discount
+        if future_plan is None or len(future_plan) == 0 or not set(self.hierarchy) <= set(future_plan.columns):
+            return future_plan
+        agg = {c: f for c, f in ((model.promo_col, 'max'), (model.discount_col, 'mean')) if c in future_plan.columns}
+        plan = ensure_datetime(future_plan, model.date_col)
+        by = level + [model.date_col]
+        return plan.groupby(by, sort=False, observed=True).agg(agg).reset_index() if agg else plan[by].drop_duplicates()
+
+    def forecast(self, horizon_dates=None, horizon_start=None, horizon_periods=None, future_plan=None, future_events=None):
+        """Forecast every level; returns one long frame with a `level` column (attributes
+        outside a level are left empty), reconciled if `reconcile` is set."""
+        assert self._fitted, "Call fit() first"
+        cols, matrices = {}, {}
+        for level, model in self.models.items():
+            horizon, grid = model._prepare_forecast(horizon_dates, horizon_start, horizon_periods,
+                                                    self._level_plan(future_plan, list(level), model), future_events)
+            cols[level] = model._forecast_keys(model._store.keys, horizon, grid)
+            matrices[level] = cols[level]['forecast'].reshape(len(model._store.keys), len(horizon))
+        if self.reconcile:
+            for level, m in self._reconciled(matrices).items():
+                cols[level]['forecast'] = m.ravel()
+        frames = []
+        for level, model in self.models.items():
+            frame = model._forecast_frame(cols[level])
+            frame.insert(0, 'level', level_name(level))
+            frames.append(frame)
+        out = pd.concat(frames, ignore_index=True)
+        attrs = [a for a in self.hierarchy if a in out.columns]
+        return out[['level'] + [c for c in out.columns if c != 'level' and c not in attrs] + attrs]
+
+    def _reconciled(self, matrices):
+        bottom = tuple(self.hierarchy)
+        if bottom not in matrices:
+            raise ValueError("Reconciliation needs the bottom level (the full hierarchy) in levels")
+        base = matrices[bottom]
+        if self.reconcile == 'proportional':
+            top = min(matrices, key=len)
+            group_map = self._maps[top]
+            totals = level_sums(base, group_map, len(matrices[top]))[group_map]
+            children = np.bincount(group_map)[group_map][:, None]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                share = np.where(totals > 0, base / np.where(totals > 0, totals, 1.0), 1.0 / children)
+            base = matrices[top][group_map] * share
+        return {level: level_sums(base, self._maps[level], len(m)) for level, m in matrices.items()}
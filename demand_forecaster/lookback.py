@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from .dataio import read_table
+
+FREQS = ('D', 'W', 'M')
+DEFAULT_LOOKBACK = {'D': 8, 'W': 6, 'M': 5}
+# lookback of a frequency no entry (not even 'default') sets
+FALLBACK = 8
+
+class LookbackIndex:
+    """Compiled lookback_config: 'default' plus overrides keyed by attribute-value
+    prefixes, e.g. ('East',) or ('East', 'S1', 'Pizza'). Rules are hashed by prefix and
+    each frequency resolves to its longest matching prefix that sets it, then
+    'default'. Freq keys at the top level ({'D': 8, 'W': 8}) count as 'default'.
+    """
+    def __init__(self, config):
+        config = config or {}
+        self.default = {f: FALLBACK for f in FREQS}
+        self.default.update(config.get('default', DEFAULT_LOOKBACK))
+        self.default.update({k: v for k, v in config.items() if k in FREQS and not isinstance(v, dict)})
+        rules = {k: v for k, v in config.items() if isinstance(k, tuple)}
+        self.freqs = tuple(sorted(set(self.default).union(*rules.values()), key=_freq_order))
+        # per prefix length: {prefix: row} and a (rules x freqs) lookback matrix, NaN = not set
+        self.levels = {}
+        for n in sorted({len(k) for k in rules}):
+            prefixes = [k for k in rules if len(k) == n]
+            values = np.array([[rules[k].get(f, np.nan) for f in self.freqs] for k in prefixes], dtype=float)
+            self.levels[n] = ({k: i for i, k in enumerate(prefixes)}, values)
+
+    def resolve(self, key):
+        """{freq: lookback} of one attribute key."""
+        out = dict(self.default)
+        for n, (rows, values) in self.levels.items():
+            i = rows.get(tuple(key[:n]))
+            if i is not None:
+                out.update({f: int(v) for f, v in zip(self.freqs, values[i]) if not np.isnan(v)})
+        return out
+
+    def arrays(self, keys):
+        """{freq: int64 lookback per key} for a list of key tuples: one hashed lookup per
+        key and prefix length, shortest first so longer prefixes win."""
+        out = np.tile(np.array([self.default[f] for f in self.freqs], dtype=np.int64), (len(keys), 1))
+        for n, (rows, values) in self.levels.items():
+            idx = np.fromiter((rows.get(k[:n], -1) for k in keys), dtype=np.int64, count=len(keys))
+            hit = np.flatnonzero(idx >= 0)
+            v = values[idx[hit]]
+            r, c = np.nonzero(~np.isnan(v))
+            out[hit[r], c] = v[r, c]
+        return {f: out[:, j] for j, f in enumerate(self.freqs)}
+
+def _freq_order(f):
+    return (FREQS.index(f), '') if f in FREQS else (len(FREQS), str(f))
+
+# ---- tabular rules ----
+def lookback_rules(df, attributes, base=None):
+    """lookback_config from a rule table: one row per override, with leading attribute
+    columns (a blank cell ends the prefix; all blank = 'default') and lookback columns
+    named by frequency (D/W/M; blank = inherit). Attribute columns may be a leading
+    subset of `attributes`. Rules are added to (a copy of) `base`.
+    """
+    config = dict(base or {'default': dict(DEFAULT_LOOKBACK)})
+    attrs = [a for a in attributes if a in df.columns]
+    if attrs != list(attributes[:len(attrs)]):
+        raise ValueError(f"Lookback rule columns must be a leading subset of {list(attributes)}, got {attrs}")
+    freqs = [c for c in df.columns if c in FREQS]
+    if not freqs:
+        raise ValueError(f"Lookback rules need at least one of the columns {list(FREQS)}")
+    values = df[attrs].to_numpy(dtype=object)
+    blank = pd.isna(values) | (values == '')
+    depth = np.where(blank.any(axis=1), blank.argmax(axis=1), len(attrs))
+    if (blank.sum(axis=1) != len(attrs) - depth).any():
+        raise ValueError("Lookback rules must set a prefix of the attribute columns (no values after a blank)")
+    looks = df[freqs].apply(pd.to_numeric, errors='raise')
+    for row, n, look in zip(values, depth, looks.itertuples(index=False)):
+        entry = {f: int(v) for f, v in zip(freqs, look) if not pd.isna(v)}
+        key = 'default' if n == 0 else tuple(row[:n])
+        config[key] = dict(config.get(key, {}), **entry)
+    return config
+
+def read_lookback_rules(path, attributes, base=None):
+    """lookback_rules from a CSV/Parquet/Arrow file; attribute values are read as text."""
+    return lookback_rules(read_table(path, dtypes={a: str for a in attributes}), attributes, base)
@@ -0,0 +1,146 @@
+import copy
+import os
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from .store import GroupStore
+from .cache import LazyStates
+
+# per-process state set up by _init_worker
+_WORKER = {}
+# below this many groups a fan-out costs more (pool start-up, sharing the store) than it saves
+MIN_PARALLEL_GROUPS = 500
+
+def effective_jobs(n_jobs):
+    """None/1 -> serial, -1 -> all cores, -2 -> all but one, ..."""
+    if n_jobs is None:
+        return 1
+    n_jobs = int(n_jobs)
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+def fans_out(model, n_groups):
+    """Whether work over `n_groups` groups goes to worker processes: n_jobs > 1 and
+    at least MIN_PARALLEL_GROUPS groups."""
+    return effective_jobs(model.n_jobs) > 1 and n_groups >= max(MIN_PARALLEL_GROUPS, 2)
+
+class SharedStore:
+    """Context manager that copies a GroupStore's arrays into shared memory blocks.
+    Entering returns a small picklable spec that workers pass to `attach_store`;
+    the blocks are unlinked on exit.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.blocks = []
+
+    def __enter__(self):
+        arrays = {}
+        for name, arr in self.store.arrays().items():
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            self.blocks.append(shm)
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            arrays[name] = (shm.name, arr.dtype.str, arr.shape)
+        return {'arrays': arrays, 'keys': self.store.keys, 'event_names': self.store.event_names}
+
+    def __exit__(self, *exc):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+def share_store(store):
+    """SharedStore, or for a memory-mapped store just its path: workers map the same files."""
+    return nullcontext({'source': store.source}) if store.source else SharedStore(store)
+
+def attach_store(spec):
+    """Rebuild a GroupStore over the shared blocks of `spec`; returns (store, blocks)."""
+    if 'source' in spec:
+        from .persist import load_store
+        return load_store(spec['source']), []
+    blocks, arrays = [], {}
+    for name, (shm_name, dtype, shape) in spec['arrays'].items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    offsets, dow_offsets = arrays.pop('offsets'), arrays.pop('dow_offsets')
+    return GroupStore.from_sorted(spec['keys'], arrays, offsets, dow_offsets, spec['event_names']), blocks
+
+def _init_worker(model, spec, args):
+    model._store, blocks = attach_store(spec)
+    model._profiler = model._profiler.fresh()
+    _WORKER.update(model=model, blocks=blocks, args=args)
+
+def _range_chunk(ranges):
+    m = _WORKER['model']
+    method = getattr(m, _WORKER['args'][0])
+    return [method(lo, hi) for lo, hi in ranges], m._profiler.drain()
+
+def _forecast_chunk(keys):
+    m = _WORKER['model']
+    return [m._forecast_groups(keys, *_WORKER['args'])], m._profiler.drain()
+
+def _base_chunk(keys):
+    m = _WORKER['model']
+    return [m._base_trend(keys, *_WORKER['args'])], m._profiler.drain()
+
+def _backtest_chunk(keys):
+    m = _WORKER['model']
+    return m._backtest_groups(keys, *_WORKER['args']), m._profiler.drain()
+
+def _run(model, func, chunks, args=()):
+    return [r for res in _imap(model, func, chunks, args) for r in res]
+
+def _imap(model, func, chunks, args=()):
+    # ship the model without its history (that goes through shared memory); `args`
+    # go with it through the initializer, once per worker rather than once per chunk
+    light = copy.copy(model)
+    light._store = None
+    light._events_daily = None
+    light._events_cache = None
+    light._profiler = model._profiler.for_worker()
+    # the callback only runs here, on merge: workers just need to know profiling is on
+    light.profile = bool(model.profile)
+    if func is _range_chunk:
+        # fit passes don't read the (previous) fitted states
+        light._group_state = None
+    elif isinstance(model._group_state, LazyStates):
+        # a lazy fit's builder is the model itself, history included
+        light._group_state = model._group_state.bound_to(light)
+    n = min(effective_jobs(model.n_jobs), len(chunks))
+    with share_store(model._store) as spec:
+        with ProcessPoolExecutor(max_workers=n, initializer=_init_worker, initargs=(light, spec, args)) as ex:
+            # map() keeps chunk order, so the merged result is identical to the serial path
+            for res, prof in ex.map(func, chunks):
+                # stage timings measured in the worker
+                model._profiler.merge(prof)
+                yield res
+
+def _chunks(items, n_jobs):
+    # a few chunks per worker so uneven groups still balance
+    n = min(len(items), effective_jobs(n_jobs) * 4)
+    return [[items[i] for i in idx] for idx in np.array_split(np.arange(len(items)), n)] if n else []
+
+def parallel_ranges(model, method, ranges):
+    """model.<method>(lo, hi) of every (lo, hi) group range, in order, across worker
+    processes. Each result is a few all-group arrays, so it returns cheaply."""
+    return _run(model, _range_chunk, _chunks(ranges, model.n_jobs), (method,))
+
+def parallel_forecast_blocks(model, keys, *args):
+    """Forecast column blocks for `keys` (in that order), computed across worker processes."""
+    return _run(model, _forecast_chunk, _chunks(keys, model.n_jobs), args)
+
+def iter_forecast_blocks(model, key_batches, *args):
+    """Yield one forecast column block per batch of keys, in order, as workers finish."""
+    for res in _imap(model, _forecast_chunk, key_batches, args):
+        yield res[0]
+
+def parallel_base_trend(model, keys, horizon_dates):
+    """(baseline x trend, trend factors) for `keys` (in that order), across worker processes."""
+    parts = _run(model, _base_chunk, _chunks(keys, model.n_jobs), (horizon_dates,))
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+def parallel_backtest(model, keys, *args):
+    """backtest() rows for `keys` (in that order), across worker processes."""
+    return _run(model, _backtest_chunk, _chunks(keys, model.n_jobs), args)
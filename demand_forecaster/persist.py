@@ -0,0 +1,269 @@
+import copy
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import MutableMapping
+import numpy as np
+import pandas as pd
+from .store import GroupStore
+from .promotions import EmpiricalLifts
+
+FORMAT_VERSION = 1
+
+# constructor arguments written to the manifest (lookback_config is stored separately)
+CONFIG = ('method', 'attributes', 'horizon_freq', 'use_trends', 'use_promotions', 'use_events', 'date_col',
+          'target_col', 'promo_col', 'discount_col', 'event_name_col', 'week_start', 'event_lag_days', 'n_jobs',
+          'compact', 'max_memory')
+
+_STATS = ('promo_n', 'promo_sum', 'disc', 'noev_n', 'noev_sum')
+_TABLE = ('start', 'sum', 'count')
+
+# ---- helpers ----
+def _scalar(v):
+    return v.item() if isinstance(v, np.generic) else v
+
+def _pack(arrays, name, parts, fields):
+    """Store a list of per-group {field: array} slices CSR style: name.offsets + name.<field>."""
+    arrays[name + '.offsets'] = np.concatenate([[0], np.cumsum([len(p[fields[0]]) for p in parts])]).astype(np.int64)
+    for f in fields:
+        arrays[f'{name}.{f}'] = np.concatenate([np.asarray(p[f]) for p in parts]) if parts else np.zeros(0)
+
+def _unpack(arrays, name, g, fields):
+    lo, hi = arrays[name + '.offsets'][g:g + 2]
+    return {f: arrays[f'{name}.{f}'][lo:hi] for f in fields}
+
+def _encode_lookback(config):
+    return [[k if k == 'default' else list(k), v] for k, v in config.items()]
+
+def _decode_lookback(pairs):
+    return {k if k == 'default' else tuple(k): v for k, v in pairs}
+
+def _frame_arrays(arrays, name, df):
+    """Numeric/datetime columns as arrays, anything else as codes + uniques (returned for the manifest)."""
+    meta = []
+    for i, c in enumerate(df.columns):
+        col = df[c]
+        if col.dtype.kind in 'biufM':
+            arrays[f'{name}.{i}'] = col.to_numpy()
+            meta.append([c, None])
+        else:
+            codes, uniques = pd.factorize(col)
+            arrays[f'{name}.{i}'] = codes.astype(np.int32)
+            meta.append([c, [_scalar(u) for u in uniques]])
+    return meta
+
+def _frame_from_arrays(arrays, name, meta):
+    out = {}
+    for i, (c, uniques) in enumerate(meta):
+        a = np.asarray(arrays[f'{name}.{i}'])
+        if uniques is None:
+            out[c] = a
+        else:
+            values = np.array(uniques + [np.nan], dtype=object)
+            out[c] = values[a]  # code -1 picks the trailing NaN
+    return pd.DataFrame(out)
+
+class PackedStates(MutableMapping):
+    """`_group_state` of a loaded model. Per-group state dicts are rebuilt from the
+    packed (possibly memory-mapped) arrays on first access, so loading does no
+    per-group work; states assigned afterwards (partial_fit) override the packed ones.
+    """
+    def __init__(self, builder, arrays, keys, lift_names, source=None):
+        self._builder = builder
+        self._a = arrays
+        self._keys = list(keys)
+        self._index = {k: i for i, k in enumerate(self._keys)}
+        self._lift_names = np.asarray(lift_names, dtype=object)
+        self._built = {}
+        self._changed = {}
+        self.source = source
+
+    def _build(self, g):
+        a = self._a
+        recent = _unpack(a, 'recent', g, ('date', 'value'))
+        stats = {k: a['lift.' + k][g:g + 1] for k in _STATS}
+        ev = _unpack(a, 'lift_ev', g, ('code', 'rows', 'n', 'sum'))
+        stats.update(ev_group=np.zeros(len(ev['code']), dtype=np.int64), ev_code=ev['code'], ev_rows=ev['rows'],
+                     ev_n=ev['n'], ev_sum=ev['sum'])
+        summ = {'recent': (recent['date'], recent['value']), 'lift_stats': stats}
+        for f in ('W', 'M', 'Y'):
+            summ[f] = _unpack(a, 'table_' + f, g, _TABLE)
+        lev = _unpack(a, 'lifts_ev', g, ('code', 'lift'))
+        lifts = EmpiricalLifts.from_params(a['lifts.promo_lift'][g], a['lifts.discount_beta'][g],
+                                           dict(zip(self._lift_names[lev['code']], lev['lift'])))
+        return self._builder._finalize_state(g, summ, lifts)
+
+    def __getitem__(self, key):
+        if key in self._changed:
+            return self._changed[key]
+        if key not in self._built:
+            if key not in self._index:
+                raise KeyError(key)
+            self._built[key] = self._build(self._index[key])
+        return self._built[key]
+
+    def __setitem__(self, key, state):
+        if key not in self._index:
+            self._index[key] = len(self._keys)
+            self._keys.append(key)
+        self._built.pop(key, None)
+        self._changed[key] = state
+
+    def __delitem__(self, key):
+        if key not in self._index:
+            raise KeyError(key)
+        self._keys.remove(key)
+        del self._index[key]
+        self._built.pop(key, None)
+        self._changed.pop(key, None)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __getstate__(self):
+        # drop the rebuild cache; a memory-mapped model is reopened from its files
+        state = dict(self.__dict__, _built={})
+        if self.source is not None:
+            state['_a'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._a is None:
+            self._a = _open_arrays(self.source, _read_manifest(self.source), True)
+
+# ---- save / load ----
+def _read_manifest(path):
+    with open(os.path.join(path, 'manifest.json')) as f:
+        return json.load(f)
+
+def _data_dir(path, manifest):
+    # saves keep their arrays in a per-save subdirectory (older ones next to the manifest)
+    return os.path.join(path, manifest.get('data', ''))
+
+def _open_arrays(path, manifest, mmap):
+    return {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None)
+            for name in manifest['arrays']}
+
+def _write_json(path, obj):
+    # write-then-rename, so readers see the old or the new file, never a partial one
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+def _store(manifest, arrays, source):
+    columns = {name[len('store.'):]: a for name, a in arrays.items() if name.startswith('store.')}
+    offsets, dow_offsets = columns.pop('offsets'), columns.pop('dow_offsets')
+    store = GroupStore.from_sorted([tuple(k) for k in manifest['keys']], columns, offsets, dow_offsets,
+                                   manifest['event_names'])
+    store.source = source
+    return store
+
+def saved_config(path):
+    """Constructor arguments stored with a saved model (without lookback_config)."""
+    return dict(_read_manifest(path)['config'])
+
+def load_store(path):
+    """The memory-mapped GroupStore of a saved model (e.g. in a worker process)."""
+    manifest = _read_manifest(path)
+    path = _data_dir(path, manifest)
+    arrays = _open_arrays(path, {'arrays': [n for n in manifest['arrays'] if n.startswith('store.')]}, True)
+    return _store(manifest, arrays, os.path.abspath(path))
+
+def save_model(model, path):
+    """Write a fitted model to directory `path`: manifest.json plus one .npy file per
+    array in a fresh `data-*` subdirectory. Files of earlier saves are never rewritten
+    (models memory-mapping them keep reading consistent arrays): the manifest is
+    switched atomically, and all but the previous save's data are then removed."""
+    store = model._store
+    states = [model._group_state[k] for k in store.keys]
+    arrays = {'store.' + name: a for name, a in store.arrays().items()}
+    _pack(arrays, 'recent', [{'date': s['recent'][0], 'value': s['recent'][1]} for s in states], ('date', 'value'))
+    for f in ('W', 'M', 'Y'):
+        _pack(arrays, 'table_' + f, [s[f] for s in states], _TABLE)
+    for k in _STATS:
+        arrays['lift.' + k] = np.concatenate([s['lift_stats'][k] for s in states]) if states else np.zeros(0)
+    _pack(arrays, 'lift_ev', [{'code': s['lift_stats']['ev_code'], 'rows': s['lift_stats']['ev_rows'],
+                               'n': s['lift_stats']['ev_n'], 'sum': s['lift_stats']['ev_sum']} for s in states],
+          ('code', 'rows', 'n', 'sum'))
+    # fitted lift parameters; event lifts refer to names by code
+    lift_names = [_scalar(n) for n in store.event_names]
+    name_index = {n: i for i, n in enumerate(lift_names)}
+    lift_ev = []
+    for s in states:
+        ev = s['lifts']._event_lifts
+        for n in ev:
+            if n not in name_index:
+                name_index[n] = len(lift_names)
+                lift_names.append(_scalar(n))
+        lift_ev.append({'code': np.array([name_index[n] for n in ev], dtype=np.int64),
+                        'lift': np.array(list(ev.values()), dtype=float)})
+    _pack(arrays, 'lifts_ev', lift_ev, ('code', 'lift'))
+    arrays['lifts.promo_lift'] = np.array([s['lifts']._promo_lift for s in states], dtype=float)
+    arrays['lifts.discount_beta'] = np.array([s['lifts']._discount_beta for s in states], dtype=float)
+    events = model._events_daily
+    events_meta = _frame_arrays(arrays, 'events', events) if events is not None else None
+
+    os.makedirs(path, exist_ok=True)
+    data = tempfile.mkdtemp(prefix='data-', dir=path)
+    os.chmod(data, 0o755)  # mkdtemp is owner-only; other processes may load the model
+    for name, a in arrays.items():
+        np.save(os.path.join(data, name + '.npy'), np.ascontiguousarray(a))
+    manifest = {'format_version': FORMAT_VERSION,
+                'config': {name: _scalar(getattr(model, name)) for name in CONFIG},
+                'lookback_config': _encode_lookback(model.lookback_config),
+                'keys': [[_scalar(v) for v in k] for k in store.keys],
+                'event_names': [_scalar(n) for n in store.event_names],
+                'lift_event_names': lift_names,
+                'events': events_meta,
+                'arrays': sorted(arrays)}
+    try:
+        previous = _read_manifest(path)
+    except (OSError, ValueError):
+        previous = None
+    # the data directory gets its own copy, so workers attach to exactly this save
+    _write_json(os.path.join(data, 'manifest.json'), manifest)
+    # the manifest goes last: a directory without one is an incomplete save
+    _write_json(os.path.join(path, 'manifest.json'), dict(manifest, data=os.path.basename(data)))
+    keep = {os.path.basename(data), previous.get('data', '') if previous else ''}
+    for name in os.listdir(path):
+        if name.startswith('data-') and name not in keep:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    if '' not in keep:
+        # arrays of a save from before data directories, now two saves old
+        for name in os.listdir(path):
+            if name.endswith('.npy'):
+                os.remove(os.path.join(path, name))
+    return path
+
+def load_model(cls, path, mmap=True, **params):
+    """Rebuild a fitted `cls` instance from a `save_model` directory. With mmap=True the
+    arrays are memory-mapped read-only, so processes forecasting from the same files
+    share their pages. `params` override the saved constructor arguments."""
+    manifest = _read_manifest(path)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format: {manifest.get('format_version')}")
+    path = _data_dir(path, manifest)
+    arrays = _open_arrays(path, manifest, mmap)
+    config = dict(manifest['config'], lookback_config=_decode_lookback(manifest['lookback_config']))
+    config.update(params)
+    model = cls(**config)
+    keys = [tuple(k) for k in manifest['keys']]
+    source = os.path.abspath(path) if mmap else None
+    model._store = _store(manifest, arrays, source)
+    # states only need the model's config to be rebuilt, not its history
+    builder = copy.copy(model)
+    builder._store = builder._group_state = None
+    model._group_state = PackedStates(builder, arrays, keys, manifest['lift_event_names'], source)
+    if manifest['events'] is not None:
+        model._events_daily = _frame_from_arrays(arrays, 'events', manifest['events'])
+    model._fitted = True
+    return model
@@ -0,0 +1,141 @@
+import heapq
+import time
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class NullProfiler:
+    """Profiler stand-in used when profiling is off: every stage is a shared no-op span."""
+    enabled = False
+
+    def stage(self, name, rows=0, group=None):
+        return _NULL_SPAN
+
+    def fresh(self):
+        return self
+
+    def for_worker(self):
+        return self
+
+    def drain(self):
+        return None
+
+    def merge(self, snapshot):
+        pass
+
+    def report(self, label=None):
+        return {}
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'rows', 'group', 't0')
+
+    def __init__(self, profiler, name, rows, group):
+        self.profiler, self.name, self.rows, self.group = profiler, name, rows, group
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.t0, self.rows, self.group)
+        return False
+
+class Profiler:
+    """Per-stage wall time, call count, rows processed and the `top` slowest groups.
+    `callback(stage, seconds, rows, group)` is called with every measurement, e.g.
+    to forward it to an external metrics collector; measurements made in worker
+    processes reach it when they are merged. `log` keeps every measurement for
+    that (see for_worker).
+    """
+    enabled = True
+
+    def __init__(self, callback=None, top=5, log=False):
+        self.callback = callback
+        self.top = top
+        self.stats = {}
+        self.slowest = {}
+        self.log = [] if log else None
+        self._seq = 0
+
+    def stage(self, name, rows=0, group=None):
+        """Context manager timing one call of stage `name` (for one group, if given)."""
+        return _Span(self, name, rows, group)
+
+    def record(self, name, seconds, rows=0, group=None):
+        st = self.stats.get(name)
+        if st is None:
+            st = self.stats[name] = [0.0, 0, 0]
+        st[0] += seconds
+        st[1] += 1
+        st[2] += int(rows or 0)
+        if group is not None:
+            self._push(name, seconds, group)
+        if self.log is not None:
+            self.log.append((name, seconds, rows, group))
+        if self.callback is not None:
+            self.callback(name, seconds, rows, group)
+
+    def _push(self, name, seconds, group):
+        heap = self.slowest.setdefault(name, [])
+        self._seq += 1
+        item = (seconds, self._seq, group)
+        if len(heap) < self.top:
+            heapq.heappush(heap, item)
+        elif seconds > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def fresh(self):
+        """An empty profiler with the same settings."""
+        return Profiler(self.callback, self.top, self.log is not None)
+
+    def for_worker(self):
+        """An empty profiler to ship to worker processes: no callback (it runs in this
+        process on merge), but a log of every measurement when there is one."""
+        return Profiler(None, self.top, self.callback is not None)
+
+    def drain(self):
+        """Return the collected measurements for `merge` and start over."""
+        snapshot = (self.stats, {k: [(s, g) for s, _, g in v] for k, v in self.slowest.items()}, self.log)
+        self.stats, self.slowest = {}, {}
+        self.log = [] if self.log is not None else None
+        return snapshot
+
+    def merge(self, snapshot):
+        """Add measurements drained from another profiler, passing logged ones to the callback."""
+        if snapshot is None:
+            return
+        stats, slowest, log = snapshot
+        if self.callback is not None:
+            for measurement in log or ():
+                self.callback(*measurement)
+        for name, (seconds, calls, rows) in stats.items():
+            st = self.stats.setdefault(name, [0.0, 0, 0])
+            st[0] += seconds
+            st[1] += calls
+            st[2] += rows
+        for name, items in slowest.items():
+            for seconds, group in items:
+                self._push(name, seconds, group)
+
+    def report(self, label=None):
+        """{stage: {'seconds', 'calls', 'rows', 'slowest_groups'}}; `label` maps a
+        recorded group to its JSON form."""
+        label = label or (lambda g: g)
+        out = {}
+        for name, (seconds, calls, rows) in self.stats.items():
+            top = sorted(self.slowest.get(name, []), reverse=True)
+            out[name] = {'seconds': seconds, 'calls': calls, 'rows': rows,
+                         'slowest_groups': [{'group': label(g), 'seconds': s} for s, _, g in top]}
+        return out
+
+def make_profiler(profile):
+    """False/None -> NullProfiler, True -> Profiler, callable -> Profiler forwarding to it."""
+    if not profile:
+        return NullProfiler()
+    return Profiler(callback=profile if callable(profile) else None)
@@ -1,10 +1,134 @@
-
 import numpy as np
 import pandas as pd
 
+def _ratio(num, den):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / np.where(den > 0, den, 1), np.nan)
+
+def batch_lift_stats(codes, n_groups, target, promo=None, discount=None, event=None):
+    """Sufficient statistics behind EmpiricalLifts for every group in one pass.
+
+    `codes` gives the group (0..n_groups-1) of each row. Per group: promo/no-promo
+    non-null counts and sums, discount OLS sums (n, x, y, xy, x^2) and no-event
+    counts/sums; per (group, event) pair present in the data: row count, non-null
+    count and sum, stored long (ev_group, ev_code, ...). Statistics of two slices
+    add up (`merge_lift_stats`), so lifts can be updated from appended rows alone.
+    A missing promo/discount column counts as all-NaN, a missing event column as
+    "no event" on every row.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    y = np.asarray(target, dtype=float)
+    ok = ~np.isnan(y)
+    yz = np.where(ok, y, 0.0)
+    G = int(n_groups)
+
+    def gsum(sel, w=None):
+        return np.bincount(codes[sel], weights=None if w is None else w[sel], minlength=G)
+
+    st = {'promo_n': np.zeros((G, 2), dtype=np.int64), 'promo_sum': np.zeros((G, 2)), 'disc': np.zeros((G, 5))}
+    if promo is not None:
+        for flag in (0, 1):
+            sel = ok & (promo == flag)
+            st['promo_n'][:, flag] = gsum(sel)
+            st['promo_sum'][:, flag] = gsum(sel, yz)
+    if discount is not None:
+        discount = np.asarray(discount, dtype=float)
+        sel = ok & ~np.isnan(discount)
+        x = np.where(sel, discount, 0.0)
+        st['disc'] = np.column_stack([gsum(sel), gsum(sel, x), gsum(sel, yz), gsum(sel, x * yz), gsum(sel, x * x)])
+    if event is None:
+        event = np.full(len(y), -1)
+    none = ok & (event < 0)
+    st['noev_n'], st['noev_sum'] = gsum(none), gsum(none, yz)
+    has = event >= 0
+    width = int(event.max()) + 1 if has.any() else 1
+    uniq, inv = np.unique(codes[has] * width + event[has], return_inverse=True)
+    st['ev_group'], st['ev_code'] = uniq // width, uniq % width
+    st['ev_rows'] = np.bincount(inv, minlength=len(uniq))
+    st['ev_n'] = np.bincount(inv, weights=ok[has].astype(float), minlength=len(uniq)).astype(np.int64)
+    st['ev_sum'] = np.bincount(inv, weights=yz[has], minlength=len(uniq))
+    return st
+
+def lift_stats(target, promo=None, discount=None, event=None):
+    """`batch_lift_stats` of a single slice (one group)."""
+    return batch_lift_stats(np.zeros(len(target), dtype=np.int64), 1, target, promo, discount, event)
+
+def slice_lift_stats(st, g):
+    """The one-group statistics of group g out of a batch (pairs are sorted by group)."""
+    lo, hi = np.searchsorted(st['ev_group'], [g, g + 1])
+    out = {k: st[k][g:g+1] for k in ('promo_n', 'promo_sum', 'disc', 'noev_n', 'noev_sum')}
+    out.update({k: st[k][lo:hi] for k in ('ev_code', 'ev_rows', 'ev_n', 'ev_sum')})
+    out['ev_group'] = np.zeros(hi - lo, dtype=np.int64)
+    return out
+
+def merge_lift_stats(a, b):
+    """Add two statistics batches over the same groups."""
+    out = {k: a[k] + b[k] for k in ('promo_n', 'promo_sum', 'disc', 'noev_n', 'noev_sum')}
+    width = int(max(a['ev_code'].max(initial=0), b['ev_code'].max(initial=0))) + 1
+    pair = np.concatenate([a['ev_group'] * width + a['ev_code'], b['ev_group'] * width + b['ev_code']])
+    uniq, inv = np.unique(pair, return_inverse=True)
+    out['ev_group'], out['ev_code'] = uniq // width, uniq % width
+    for k in ('ev_rows', 'ev_n', 'ev_sum'):
+        v = np.bincount(inv, weights=np.concatenate([a[k], b[k]]), minlength=len(uniq))
+        out[k] = v if k == 'ev_sum' else v.astype(np.int64)
+    return out
+
+def concat_lift_stats(parts, bases):
+    """Join statistics batches of consecutive group ranges; `bases` holds the first
+    group of each part (its `ev_group` values are relative to it)."""
+    out = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    out['ev_group'] = np.concatenate([p['ev_group'] + b for p, b in zip(parts, bases)])
+    return out
+
+def lift_table(st, event_names=()):
+    """Vectorized lift estimation from a statistics batch.
+
+    Returns (table, events): `table` is indexed by group with promo_lift and
+    discount_beta; `events` is long (group, event_name, lift) for every event seen
+    on at least 3 rows of a group whose no-event mean is positive.
+    """
+    # promo ratio
+    base = _ratio(st['promo_sum'][:, 0], st['promo_n'][:, 0])
+    promo = _ratio(st['promo_sum'][:, 1], st['promo_n'][:, 1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        promo_lift = np.where((base > 0) & ~np.isnan(promo), promo / np.where(base > 0, base, 1.0), 1.0)
+        # discount elasticity: closed-form OLS slope, needs >= 10 points and a non-constant discount
+        n, sx, sy, sxy, sxx = st['disc'].T
+        denom = n*sxx - sx*sx
+        fit = (n >= 10) & (denom > 1e-10 * n * sxx)
+        slope = (n*sxy - sx*sy) / np.where(fit, denom, 1.0)
+        mean_sales = _ratio(sy, n)
+        beta = np.where(fit & (mean_sales > 0), slope / np.where(mean_sales > 0, mean_sales, 1.0), 0.0)
+    table = pd.DataFrame({'promo_lift': promo_lift, 'discount_beta': beta})
+    # event lifts
+    no_ev = _ratio(st['noev_sum'], st['noev_n'])
+    keep = (st['ev_rows'] >= 3) & (no_ev[st['ev_group']] > 0)
+    g = st['ev_group'][keep]
+    names = np.asarray(event_names, dtype=object)
+    events = pd.DataFrame({'group': g, 'event_name': names[st['ev_code'][keep]] if keep.any() else np.array([], dtype=object),
+                           'lift': _ratio(st['ev_sum'][keep], st['ev_n'][keep]) / no_ev[g]})
+    return table, events
+
+def batch_lift_factors(lifts, promo_flag, discount, event_code, event_names=(), promotions=True, events=True):
+    """Vectorized `EmpiricalLifts.lift_for` over (groups x dates) arrays: row i is scored
+    with lifts[i]; event_code indexes event_names (-1 = none). promotions/events=False
+    leave those lifts out.
+    """
+    f = np.ones(np.shape(promo_flag))
+    if promotions:
+        promo_lift = np.array([l._promo_lift for l in lifts])[:, None]
+        beta = np.array([l._discount_beta for l in lifts])[:, None]
+        f = np.where(promo_flag != 0, f * promo_lift, f)
+        f = np.where(discount != 0, f * (1.0 + beta * discount), f)
+    if events and len(event_names) and len(lifts):
+        # trailing 1.0 column is picked up by code -1
+        table = np.array([[l._event_lifts.get(e, 1.0) for e in event_names] + [1.0] for l in lifts])
+        f = f * np.take_along_axis(table, event_code, axis=1)
+    return f
+
 class EmpiricalLifts:
     def __init__(self, df, target_col='sales', promo_col='promo_flag', discount_col='discount', event_name_col='event_name'):
-        self.df = df.copy()
+        self.df = df
         self.target_col = target_col
         self.promo_col = promo_col if promo_col in df.columns else None
         self.discount_col = discount_col if discount_col in df.columns else None
@@ -14,32 +138,34 @@ class EmpiricalLifts:
         self._event_lifts = {}
         self._compute()
 
+    @classmethod
+    def from_stats(cls, stats, event_names=()):
+        """Lifts of the single group held in a `lift_stats` batch."""
+        table, events = lift_table(stats, event_names)
+        return cls.from_params(table['promo_lift'].iloc[0], table['discount_beta'].iloc[0],
+                               dict(zip(events['event_name'], events['lift'])))
+
+    @classmethod
+    def from_params(cls, promo_lift=1.0, discount_beta=0.0, event_lifts=None):
+        """Wrap already-estimated parameters (e.g. one row of `lift_table`)."""
+        self = cls.__new__(cls)
+        self.df = None
+        self._promo_lift = float(promo_lift)
+        self._discount_beta = float(discount_beta)
+        self._event_lifts = {k: float(v) for k, v in (event_lifts or {}).items()}
+        return self
+
     def _compute(self):
-        d = self.df.copy()
-        # promo ratio
-        if self.promo_col:
-            base = d[d[self.promo_col]==0][self.target_col].mean()
-            promo = d[d[self.promo_col]==1][self.target_col].mean()
-            if base and base>0 and not pd.isna(promo):
-                self._promo_lift = float(promo/base)
-        # discount elasticity
-        if self.discount_col:
-            dd = d.dropna(subset=[self.target_col, self.discount_col])
-            if len(dd) >= 10 and dd[self.discount_col].std() > 0:
-                x = dd[self.discount_col].astype(float).values
-                y = dd[self.target_col].astype(float).values
-                b = np.polyfit(x, y, 1)[0]
-                mean_sales = dd[self.target_col].mean()
-                if mean_sales and mean_sales>0:
-                    self._discount_beta = float(b/mean_sales)
-        # event lifts
+        d = self.df
+        event, names = None, []
         if self.event_name_col:
-            no_ev = d[d[self.event_name_col].isna()][self.target_col].mean()
-            if no_ev and no_ev>0:
-                for ev, grp in d.groupby(self.event_name_col):
-                    if pd.isna(ev): continue
-                    if len(grp) >= 3:
-                        self._event_lifts[ev] = float(grp[self.target_col].mean()/no_ev)
+            event, names = pd.factorize(d[self.event_name_col])
+        stats = lift_stats(d[self.target_col].to_numpy(dtype=float),
+                           d[self.promo_col].to_numpy(dtype=float) if self.promo_col else None,
+                           pd.to_numeric(d[self.discount_col], errors='coerce').to_numpy(dtype=float) if self.discount_col else None,
+                           event)
+        fitted = self.from_stats(stats, names)
+        self._promo_lift, self._discount_beta, self._event_lifts = fitted._promo_lift, fitted._discount_beta, fitted._event_lifts
 
     def lift_for(self, promo_flag=None, discount_val=None, event_name=None):
         f = 1.0
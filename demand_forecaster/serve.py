@@ -0,0 +1,331 @@
+import argparse, asyncio, json, os, sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from .forecaster import AttributeAwareForecaster
+from .dataio import read_table
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+# ---- helpers ----
+def _horizon_spec(req):
+    if req.get('horizon_dates') is not None:
+        return ('dates', tuple(str(d) for d in req['horizon_dates']))
+    if req.get('horizon_start') is None or req.get('horizon_periods') is None:
+        raise ValueError("Provide horizon_dates or (horizon_start & horizon_periods)")
+    return ('start', str(req['horizon_start']), int(req['horizon_periods']))
+
+def _rounds(keysets, planned):
+    """Split request positions into rounds, each run as one vectorized forecast. A
+    group's plan rows must come from a single request, so a request with a plan may
+    not share groups with any other request of its round (requests without one may)."""
+    rounds = []
+    for i, (keys, has_plan) in enumerate(zip(keysets, planned)):
+        for members, seen, claimed in rounds:
+            if claimed.isdisjoint(keys) and (not has_plan or seen.isdisjoint(keys)):
+                break
+        else:
+            members, seen, claimed = [], set(), set()
+            rounds.append((members, seen, claimed))
+        members.append(i)
+        seen.update(keys)
+        if has_plan:
+            claimed.update(keys)
+    return [members for members, _, _ in rounds]
+
+class ForecastService:
+    """Keeps a saved model in memory and answers forecast requests in batches.
+
+    Requests (dicts) name `groups` (attribute dicts or value lists in attribute order;
+    default: every group), a horizon (`horizon_dates`, or `horizon_start` and
+    `horizon_periods`) and an optional `plan` (future plan rows). Requests arriving
+    within `batch_window` seconds of each other are coalesced: those sharing a horizon
+    run as one vectorized forecast per round of non-overlapping groups, on a single
+    worker thread so the event loop stays free. The last `lru_size` responses are kept.
+    reload() swaps in a newly saved model once it is loaded; in-flight batches finish
+    on the model they started with.
+    """
+    def __init__(self, model_path, params=None, future_events=None, batch_window=0.005, max_batch=256, lru_size=1024):
+        self.model_path = model_path
+        self.params = params or {}
+        self.future_events = future_events
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.lru_size = lru_size
+        self.version = 0
+        self._lru = OrderedDict()
+        self._worker = ThreadPoolExecutor(1)
+        self._queue = None
+        self._swap(path=model_path, loaded=self._open(model_path))
+
+    def _open(self, path):
+        # the slow part of a reload; touches no service state, so it may run on any thread
+        mtime = _mtime(path)
+        model = AttributeAwareForecaster.load(path, **self.params)
+        index = {tuple(str(v) for v in key): key for key in model._store.keys}
+        # future events are the same for every request: explode them once per model
+        events = model._explode_events(self.future_events)
+        return model, index, events, mtime
+
+    def _swap(self, path, loaded):
+        # on the event loop (or in __init__): replace the model and drop stale responses
+        self.model, self._index, self._events, self._mtime = loaded
+        self.model_path = path
+        self.version += 1
+        self._lru.clear()
+
+    async def reload(self, path=None):
+        """Load the model saved at `path` (default: the current path) off the event loop and swap it in."""
+        path = path or self.model_path
+        loaded = await asyncio.get_running_loop().run_in_executor(None, self._open, path)
+        self._swap(path, loaded)
+        return self.info()
+
+    def info(self):
+        m = self.model
+        return {'model': self.model_path, 'version': self.version, 'groups': len(m._store.keys),
+                'attributes': m.attributes, 'horizon_freq': m.horizon_freq, 'cached_responses': len(self._lru)}
+
+    async def forecast(self, req):
+        """Response (JSON-ready dict) for one request, from the LRU or the next batch."""
+        token = json.dumps(req, sort_keys=True, default=str)
+        hit = self._lru.get(token)
+        if hit is not None:
+            self._lru.move_to_end(token)
+            return hit
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            asyncio.get_running_loop().create_task(self._batcher())
+        fut = asyncio.get_running_loop().create_future()
+        version = self.version
+        await self._queue.put((req, fut))
+        res = await fut
+        if self.lru_size and version == self.version:
+            self._lru[token] = res
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+        return res
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            results = await loop.run_in_executor(self._worker, self._run_batch, self.model, self._index, self._events,
+                                                 [req for req, _ in batch])
+            for (_, fut), res in zip(batch, results):
+                if fut.done():
+                    continue
+                if isinstance(res, Exception):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+
+    def _parse(self, model, index, req):
+        if not isinstance(req, dict):
+            raise ValueError("Request must be a JSON object")
+        groups = req.get('groups')
+        if groups is None:
+            keys = list(model._store.keys)
+        else:
+            keys = []
+            for g in groups:
+                values = [g.get(a) for a in model.attributes] if isinstance(g, dict) else list(g)
+                key = index.get(tuple(str(v) for v in values))
+                if key is None:
+                    raise ValueError(f"Unknown group {g}")
+                keys.append(key)
+            keys = list(dict.fromkeys(keys))
+        plan = req.get('plan')
+        if plan:
+            plan = pd.DataFrame(plan)
+            missing = [c for c in model.attributes + [model.date_col] if c not in plan.columns]
+            if missing:
+                raise ValueError(f"Plan rows need columns {missing}")
+            # only this request's groups, with attribute values as the model stores them
+            found = [index.get(tuple(str(v) for v in row)) for row in plan[model.attributes].itertuples(index=False)]
+            wanted = set(keys)
+            keep = np.array([k in wanted for k in found], dtype=bool)
+            plan = plan[keep].reset_index(drop=True)
+            for i, a in enumerate(model.attributes):
+                plan[a] = [k[i] for k, ok in zip(found, keep) if ok]
+        return keys, _horizon_spec(req), plan if plan is not None and len(plan) else None
+
+    def _run_batch(self, model, index, events, reqs):
+        """Answer `reqs` (runs on the worker thread): one forecast per horizon and round."""
+        results, parsed = [None] * len(reqs), {}
+        for i, req in enumerate(reqs):
+            try:
+                parsed[i] = self._parse(model, index, req)
+            except Exception as e:
+                results[i] = ValueError(str(e))
+        by_horizon = {}
+        for i, (_, spec, _) in parsed.items():
+            by_horizon.setdefault(spec, []).append(i)
+        for spec, members in by_horizon.items():
+            for rnd in _rounds([parsed[i][0] for i in members], [parsed[i][2] is not None for i in members]):
+                idx = [members[j] for j in rnd]
+                try:
+                    for i, res in zip(idx, self._forecast_round(model, events, spec, [parsed[i] for i in idx])):
+                        results[i] = res
+                except Exception as e:
+                    for i in idx:
+                        results[i] = ValueError(str(e))
+        return results
+
+    def _forecast_round(self, model, events, spec, parsed):
+        plans = [p for _, _, p in parsed if p is not None]
+        plan = pd.concat(plans, ignore_index=True) if plans else None
+        if spec[0] == 'dates':
+            horizon_dates = model._horizon_dates(list(spec[1]), None, None)
+        else:
+            horizon_dates = model._horizon_dates(None, spec[1], spec[2])
+        keys = [k for keys, _, _ in parsed for k in keys]
+        # plan and events are only joined to the round's groups
+        grid = model._forecast_grid(horizon_dates, plan, events, keys)
+        cols = model._forecast_keys(keys, horizon_dates, grid)
+        n = len(horizon_dates)
+        dates = [str(d) for d in np.datetime_as_string(np.asarray(horizon_dates, dtype='datetime64[D]'))]
+        out, start = [], 0
+        for req_keys, _, _ in parsed:
+            lo, hi = start * n, (start + len(req_keys)) * n
+            start += len(req_keys)
+            part = {c: v[lo:hi].tolist() for c, v in cols.items() if c != 'date'}
+            part['date'] = dates * len(req_keys)
+            out.append({'columns': ['date'] + model.attributes + ['forecast', 'trend_factor', 'promo_flag', 'discount', 'event_name'],
+                        'rows': [list(r) for r in zip(part['date'], *[part[a] for a in model.attributes],
+                                                      part['forecast'], part['trend_factor'], part['promo_flag'],
+                                                      part['discount'], part['event_name'])]})
+        return out
+
+    # ----------------- HTTP -----------------
+    async def handle(self, reader, writer):
+        """Minimal HTTP/1.1 (keep-alive) over a TCP or Unix socket connection.
+        GET /health, POST /forecast (request JSON), POST /reload ({"path": ...} optional)."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target = line.decode('latin-1').split()[:2]
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b'\r\n', b'\n', b''):
+                        break
+                    k, _, v = h.decode('latin-1').partition(':')
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+                status, payload = await self._route(method, target.split('?')[0], body)
+                data = json.dumps(payload, default=str).encode()
+                close = headers.get('connection', '').lower() == 'close'
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\nConnection: {'close' if close else 'keep-alive'}\r\n\r\n".encode()
+                             + data)
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        try:
+            if path == '/health':
+                return 200, self.info()
+            if path not in ('/forecast', '/reload'):
+                return 404, {'error': f'No route {path}'}
+            if method != 'POST':
+                return 405, {'error': 'Use POST'}
+            req = json.loads(body or b'{}')
+            if path == '/reload':
+                return 200, await self.reload(req.get('path'))
+            return 200, await self.forecast(req)
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f'{type(e).__name__}: {e}'}
+
+    async def watch(self, interval):
+        """Reload whenever the saved model at model_path is rewritten."""
+        while True:
+            await asyncio.sleep(interval)
+            mtime = _mtime(self.model_path)
+            if mtime is not None and mtime != self._mtime:
+                try:
+                    info = await self.reload()
+                    print(f"Reloaded model {info['model']} (version {info['version']})", flush=True)
+                except Exception as e:
+                    print(f"Reload failed: {e}", file=sys.stderr, flush=True)
+
+def _mtime(path):
+    try:
+        return os.stat(os.path.join(path, 'manifest.json')).st_mtime_ns
+    except OSError:
+        return None
+
+async def serve(service, host='127.0.0.1', port=8765, socket_path=None, watch=0):
+    if socket_path:
+        server = await asyncio.start_unix_server(service.handle, path=socket_path)
+        where = socket_path
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        where = f"http://{host}:{port}"
+    print(f"Serving {service.model_path} on {where}", flush=True)
+    if watch:
+        asyncio.get_running_loop().create_task(service.watch(watch))
+    async with server:
+        await server.serve_forever()
+
+def main():
+    p = argparse.ArgumentParser(description='Demand Forecaster service: answers forecast requests from an in-memory model')
+    p.add_argument('--model_in', required=True, help='Model directory saved with --model_out / model.save()')
+    p.add_argument('--events', help='Events CSV/Parquet/Arrow used as future events for every request')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--socket', help='Listen on this Unix socket instead of TCP')
+    # Forecast-time options (as in the CLI)
+    p.add_argument('--horizon_freq', choices=['D','W','M'], default='D')
+    p.add_argument('--method', choices=['wma','median'], default='wma')
+    p.add_argument('--use_trends', action='store_true')
+    p.add_argument('--use_promotions', action='store_true')
+    p.add_argument('--use_events', action='store_true')
+    p.add_argument('--lookback_json', help='JSON string or path to JSON file for lookback config')
+    p.add_argument('--n_jobs', type=int, default=None, help='Worker processes per batch (-1 = all cores)')
+    # Serving
+    p.add_argument('--batch_window_ms', type=float, default=5.0, help='Wait this long to coalesce concurrent requests')
+    p.add_argument('--max_batch', type=int, default=256, help='Most requests per batch')
+    p.add_argument('--lru_size', type=int, default=1024, help='Recent responses kept in memory')
+    p.add_argument('--watch', type=float, default=0, help='Reload the model when --model_in is rewritten (poll every N seconds)')
+
+    args = p.parse_args()
+    lb = {'default': {'D':8,'W':6,'M':5}}
+    if args.lookback_json:
+        txt = args.lookback_json
+        if txt.strip().endswith('.json'):
+            with open(txt, 'r') as f:
+                lb = json.load(f)
+        else:
+            lb = json.loads(txt)
+    params = dict(method=args.method, horizon_freq=args.horizon_freq, lookback_config=lb, use_trends=args.use_trends,
+                  use_promotions=args.use_promotions, use_events=args.use_events, n_jobs=args.n_jobs)
+    events = read_table(args.events) if args.events else None
+    service = ForecastService(args.model_in, params, future_events=events, batch_window=args.batch_window_ms / 1000.0,
+                              max_batch=args.max_batch, lru_size=args.lru_size)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket, args.watch))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
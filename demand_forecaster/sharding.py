@@ -0,0 +1,55 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from .dataio import table_format, read_table, TableWriter
+
+# ---- helpers ----
+def parse_shard(spec):
+    """'k/N' -> (k, N) with 0 <= k < N."""
+    try:
+        k, n = (int(x) for x in str(spec).split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like k/N, got {spec!r}")
+    if n < 1 or not 0 <= k < n:
+        raise ValueError(f"Shard index must satisfy 0 <= k < N, got {spec!r}")
+    return k, n
+
+def shard_path(path, shard):
+    """Fill a `{shard}` placeholder in `path` with the shard index (pre-partitioned inputs, per-shard outputs)."""
+    return path.replace('{shard}', str(shard[0])) if path and shard else path
+
+def shard_of(key, n_shards):
+    """Stable shard of an attribute key: a hash of the values' text, so the same group
+    lands in the same shard on every machine, run and input format."""
+    text = '\x1f'.join(str(v) for v in key).encode()
+    return int.from_bytes(hashlib.blake2b(text, digest_size=8).digest(), 'little') % n_shards
+
+def shard_filter(df, attributes, shard):
+    """Rows of `df` whose attribute key falls in `shard` = (k, N). Frames that do not
+    carry every attribute (e.g. events scoped to a region only) may apply to groups of
+    any shard and are returned whole."""
+    if shard is None or df is None or not attributes or not set(attributes) <= set(df.columns):
+        return df
+    k, n = shard
+    keys = df[attributes].drop_duplicates()
+    mine = np.array([shard_of(key, n) == k for key in keys.itertuples(index=False)], dtype=bool)
+    index = pd.MultiIndex.from_frame(keys[mine]) if mine.any() else pd.MultiIndex.from_tuples([], names=attributes)
+    return df[pd.MultiIndex.from_frame(df[attributes]).isin(index)]
+
+def _read_shard(path, attributes, date_col):
+    dtypes = {a: str for a in attributes}
+    if table_format(path) == 'csv':
+        # round-trip float parsing, so merged CSV values match a single-node run exactly
+        return pd.read_csv(path, dtype=dtypes, parse_dates=[date_col], float_precision='round_trip')
+    return read_table(path, dtypes=dtypes, parse_dates=[date_col])
+
+def merge_shards(paths, out, attributes, date_col='date'):
+    """Combine per-shard forecast files into `out`, sorted like a single-node run
+    (by attributes, then date). Returns the number of rows written."""
+    attributes = list(attributes)
+    frames = [_read_shard(p, attributes, date_col) for p in paths]
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(attributes + [date_col], kind='stable').reset_index(drop=True)
+    with TableWriter(out) as w:
+        w.write(df)
+    return len(df)
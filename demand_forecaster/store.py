@@ -0,0 +1,314 @@
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+import pandas as pd
+
+class GroupStore:
+    """Columnar history store shared by all attribute groups.
+
+    Every column is one NumPy array sorted by (group code, day of week, date), so a
+    group is the slice offsets[g]:offsets[g+1] (CSR style) and each weekday inside it
+    is a contiguous, date-sorted run bounded by dow_offsets[g, d]:dow_offsets[g, d+1].
+    Columns: date (datetime64[ns]), target (float), promo/discount (float, optional)
+    and event (int codes into event_names, -1 = no event, optional); compact stores
+    hold float32 target/discount and an int8 promo (-1 = missing). `source` is the
+    saved-model directory the arrays are memory-mapped from, if any; with `spill_dir`
+    the sorted columns are written to memory-mapped files there instead of RAM.
+    """
+    def __init__(self, keys, codes, columns, event_names=None, spill_dir=None):
+        self.keys = list(keys)
+        self.key_index = {k: i for i, k in enumerate(self.keys)}
+        self.event_names = np.asarray(event_names if event_names is not None else [], dtype=object)
+        dow = columns['date'].astype('datetime64[D]').view('int64')
+        dow = (dow + 3) % 7  # 1970-01-01 was a Thursday
+        order = np.lexsort((columns['date'], dow, codes))
+        self.columns = {c: _take(v, order, spill_dir, c) for c, v in columns.items()}
+        run = codes[order].astype(np.int64) * 7 + dow[order]
+        bounds = np.searchsorted(run, np.arange(len(self.keys) * 7 + 1))
+        self.dow_offsets = np.column_stack([bounds[:-1].reshape(-1, 7), bounds[7::7]]) if self.keys else np.zeros((0, 8), dtype=np.int64)
+        self.offsets = bounds[::7]
+        self.source = None
+        if spill_dir is not None:
+            weakref.finalize(self, shutil.rmtree, spill_dir, True)
+
+    @classmethod
+    def from_sorted(cls, keys, columns, offsets, dow_offsets, event_names=None):
+        """Wrap arrays that are already in store order (shared memory, mmap) without copying."""
+        self = cls.__new__(cls)
+        self.keys = list(keys)
+        self.key_index = {k: i for i, k in enumerate(self.keys)}
+        self.event_names = np.asarray(event_names if event_names is not None else [], dtype=object)
+        self.columns = dict(columns)
+        self.offsets = offsets
+        self.dow_offsets = dow_offsets
+        self.source = None
+        return self
+
+    def arrays(self):
+        """All numeric arrays backing the store, by name (columns plus offsets)."""
+        return dict(self.columns, offsets=self.offsets, dow_offsets=self.dow_offsets)
+
+    @classmethod
+    def from_frame(cls, df, attributes, date_col='date', target_col='sales', promo_col='promo_flag',
+                   discount_col='discount', event_name_col='event_name', keys=None, event_names=None,
+                   compact=False, max_bytes=None):
+        """Build a store from a (merged) sales frame. Rows with a missing attribute
+        value (as `groupby` would) or a missing date are dropped. `keys`/`event_names`
+        extend existing codings (used when appending) instead of starting new ones.
+        compact: float32/int8 columns (see encode_frame); a store larger than
+        `max_bytes` is spilled to memory-mapped temporary files.
+        """
+        keys, codes, columns, names = encode_frame(df, attributes, date_col, target_col, promo_col, discount_col,
+                                                   event_name_col, keys, event_names, compact)
+        return cls(keys, codes, columns, names, _spill_dir(columns, max_bytes))
+
+    @classmethod
+    def from_chunks(cls, chunks, attributes, date_col='date', target_col='sales', promo_col='promo_flag',
+                    discount_col='discount', event_name_col='event_name', compact=False, max_bytes=None):
+        """Build a store from an iterable of (merged) sales frames, e.g. a chunked CSV
+        reader. Only the encoded column arrays of each chunk are kept (on disk once they
+        outgrow `max_bytes`, as is the finished store), and the result equals
+        `from_frame` on the concatenated chunks.
+        """
+        keys, names, sink = [], [], _ColumnSink(max_bytes)
+        for chunk in chunks:
+            keys, c, cols, names = encode_frame(chunk, attributes, date_col, target_col, promo_col,
+                                                discount_col, event_name_col, keys, names, compact)
+            sink.append(dict(cols, code=c))
+        columns = sink.finish()
+        # chunks meet groups in arrival order: recode them in sorted key order like from_frame
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        rank = np.empty(len(keys), dtype=np.int64)
+        rank[order] = np.arange(len(keys))
+        codes = rank[columns.pop('code')] if 'code' in columns else np.zeros(0, dtype=np.int64)
+        columns.setdefault('date', np.zeros(0, dtype='datetime64[ns]'))
+        columns.setdefault('target', np.zeros(0))
+        if 'event' in columns:
+            columns['event'] = columns['event'].astype(np.int32, copy=False)
+        columns['date'] = columns['date'].astype('datetime64[ns]', copy=False)
+        try:
+            return cls([keys[i] for i in order], codes, columns, names, _spill_dir(columns, max_bytes))
+        finally:
+            sink.close()  # the store holds sorted copies
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def n_rows(self):
+        return len(self.columns['date'])
+
+    def group(self, g):
+        """Zero-copy views of every column for group code g."""
+        lo, hi = self.offsets[g], self.offsets[g + 1]
+        return {c: v[lo:hi] for c, v in self.columns.items()}
+
+    def dow_parts(self, g):
+        """{weekday: (dates, target)} views for group code g (cf. `baselines.seasonal_split`)."""
+        b = self.dow_offsets[g]
+        date, target = self.columns['date'], self.columns['target']
+        return {d: (date[b[d]:b[d + 1]], target[b[d]:b[d + 1]]) for d in range(7) if b[d + 1] > b[d]}
+
+    @property
+    def nbytes(self):
+        return sum(v.nbytes for v in self.columns.values())
+
+    def group_ranges(self, max_rows=None):
+        """Consecutive (lo, hi) group-code ranges of at most `max_rows` rows each (a
+        larger group gets a range of its own); one range without a limit."""
+        G = len(self.keys)
+        if not max_rows or self.n_rows <= max_rows:
+            return [(0, G)]
+        out, lo = [], 0
+        while lo < G:
+            hi = int(np.searchsorted(self.offsets, self.offsets[lo] + max_rows, side='right')) - 1
+            hi = min(max(hi, lo + 1), G)
+            out.append((lo, hi))
+            lo = hi
+        return out
+
+    def group_codes(self):
+        """Group code of every row (in store order)."""
+        return np.repeat(np.arange(len(self.keys)), np.diff(self.offsets))
+
+    def append(self, other):
+        """Return a new store holding this store's rows plus `other`'s.
+        `other` must have been built with this store's keys/event_names as prefix.
+        Its rows are spliced into their (group, weekday) runs, after rows of equal date
+        (as a stable re-sort would place them): a search per new row and one copy of
+        each column, instead of re-sorting the whole history.
+        """
+        runs, other_runs = self.run_bounds(), other.run_bounds()
+        pos = np.searchsorted(_run_keys(self.columns['date'], runs), _run_keys(other.columns['date'], other_runs),
+                              side='right')
+        columns = {}
+        for c in list(self.columns) + [c for c in other.columns if c not in self.columns]:
+            dtype = (self.columns[c] if c in self.columns else other.columns[c]).dtype
+            old = self.columns[c] if c in self.columns else np.full(self.n_rows, _missing(dtype), dtype=dtype)
+            new = other.columns[c] if c in other.columns else np.full(other.n_rows, _missing(dtype), dtype=dtype)
+            columns[c] = np.insert(old, pos, new)
+        # groups new in `other` start after all stored rows
+        runs = np.concatenate([runs[:-1], np.full(len(other_runs) - len(runs) + 1, self.n_rows)])
+        bounds = runs + other_runs
+        dow_offsets = np.column_stack([bounds[:-1].reshape(-1, 7), bounds[7::7]]) if other.keys else np.zeros((0, 8), dtype=np.int64)
+        return GroupStore.from_sorted(other.keys, columns, bounds[::7], dow_offsets, other.event_names)
+
+    def run_bounds(self):
+        """Start of every (group, weekday) run plus the row count: run r = 7 * g + weekday."""
+        return np.concatenate([self.dow_offsets[:, :7].ravel(), [self.n_rows]]).astype(np.int64)
+
+    def rollup(self, group_map, keys):
+        """Aggregate groups into coarser ones: group g becomes keys[group_map[g]] and rows
+        are combined per (new group, date): target summed (NaN if all missing), promo
+        as max (any child on promo), discount as mean, event as the highest code.
+        """
+        codes = np.asarray(group_map, dtype=np.int64)[self.group_codes()]
+        date = self.columns['date']
+        order = np.lexsort((date, codes))
+        codes, date = codes[order], date[order]
+        new = np.ones(len(codes), dtype=bool)
+        new[1:] = (codes[1:] != codes[:-1]) | (date[1:] != date[:-1])
+        starts = np.flatnonzero(new)
+        columns = {'date': date[starts]}
+        if len(starts) == 0:
+            columns.update({c: v[:0] for c, v in self.columns.items() if c != 'date'})
+            return GroupStore(keys, codes, columns, self.event_names)
+        total, count = _run_sums(self.columns['target'][order], starts)
+        columns['target'] = np.where(count > 0, total, np.nan)
+        if 'promo' in self.columns:
+            columns['promo'] = np.fmax.reduceat(self.columns['promo'][order], starts)
+        if 'discount' in self.columns:
+            total, count = _run_sums(self.columns['discount'][order], starts)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                columns['discount'] = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+        if 'event' in self.columns:
+            columns['event'] = np.maximum.reduceat(self.columns['event'][order], starts)
+        return GroupStore(keys, codes[starts], columns, self.event_names)
+
+_RUN_KEY = np.dtype([('run', '<i8'), ('date', '<i8')])
+
+def _run_keys(date, runs):
+    # (run, date) of every row: sorted in store order, so new rows can be placed by searchsorted
+    keys = np.empty(len(date), dtype=_RUN_KEY)
+    keys['run'] = np.repeat(np.arange(len(runs) - 1), np.diff(runs))
+    keys['date'] = np.asarray(date).view(np.int64)
+    return keys
+
+def _missing(dtype):
+    # fill for rows lacking a column: -1 in integer columns (event, compact promo), else NaN
+    return -1 if np.dtype(dtype).kind in 'iu' else np.nan
+
+def _take(values, order, spill_dir, name):
+    if spill_dir is None:
+        return values[order]
+    out = np.lib.format.open_memmap(os.path.join(spill_dir, name + '.npy'), mode='w+', dtype=values.dtype,
+                                    shape=(len(order),))
+    np.take(values, order, out=out)
+    out.flush()
+    return np.load(os.path.join(spill_dir, name + '.npy'), mmap_mode='r')
+
+def _spill_dir(columns, max_bytes):
+    """A fresh temporary directory when the columns outgrow max_bytes, else None."""
+    if max_bytes is None or sum(v.nbytes for v in columns.values()) <= max_bytes:
+        return None
+    return tempfile.mkdtemp(prefix='demand_forecaster_store_')
+
+class _ColumnSink:
+    """Encoded chunk columns appended in memory or, once they outgrow `max_bytes`,
+    to raw files in a temporary directory (read back memory-mapped). Columns missing
+    from some chunks are filled like GroupStore.append does."""
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.parts, self.dtypes = {}, {}
+        self.rows = self.nbytes = 0
+        self.directory = None
+
+    def append(self, cols):
+        n = len(cols['date'])
+        for c, dtype in self.dtypes.items():
+            if c not in cols:
+                cols[c] = np.full(n, _missing(dtype), dtype=dtype)
+        for c, v in cols.items():
+            if c not in self.dtypes:
+                self.dtypes[c] = v.dtype
+                self.parts[c] = []
+                self._put(c, np.full(self.rows, _missing(v.dtype), dtype=v.dtype))
+            self._put(c, np.asarray(v, dtype=self.dtypes[c]))
+            self.nbytes += v.nbytes
+        self.rows += n
+        if self.directory is None and self.max_bytes is not None and self.nbytes > self.max_bytes:
+            self.directory = tempfile.mkdtemp(prefix='demand_forecaster_chunks_')
+            for c, parts in self.parts.items():
+                self.parts[c] = []
+                for part in parts:
+                    self._put(c, part)
+
+    def _put(self, c, values):
+        if self.directory is None:
+            self.parts[c].append(values)
+            return
+        with open(os.path.join(self.directory, c + '.bin'), 'ab') as f:
+            f.write(np.ascontiguousarray(values).tobytes())
+
+    def finish(self):
+        """{column: array} of everything appended (memory-mapped if spilled)."""
+        if self.directory is None:
+            return {c: np.concatenate(parts) for c, parts in self.parts.items()}
+        return {c: np.memmap(os.path.join(self.directory, c + '.bin'), dtype=self.dtypes[c], mode='r', shape=(self.rows,))
+                for c in self.dtypes}
+
+    def close(self):
+        if self.directory is not None:
+            shutil.rmtree(self.directory, True)
+            self.directory = None
+
+def _run_sums(values, starts):
+    """NaN-skipping sums and non-null counts of the runs beginning at `starts`."""
+    values = np.asarray(values, dtype=float)
+    ok = ~np.isnan(values)
+    return np.add.reduceat(np.where(ok, values, 0.0), starts), np.add.reduceat(ok.astype(np.int64), starts)
+
+def encode_frame(df, attributes, date_col='date', target_col='sales', promo_col='promo_flag',
+                 discount_col='discount', event_name_col='event_name', keys=None, event_names=None, compact=False):
+    """Encode a sales frame into (keys, group codes, column arrays, event names) for
+    GroupStore, extending the given key/event codings in place of new ones. compact:
+    float32 target/discount and an int8 promo flag with -1 for missing values.
+    """
+    keys = list(keys or [])
+    if attributes:
+        grouper = df.groupby(attributes, sort=True, observed=True)
+        local = grouper.ngroup().to_numpy()
+        found = [k if isinstance(k, tuple) else (k,) for k in grouper.size().index]
+    else:
+        local = np.zeros(len(df), dtype=np.int64)
+        found = [tuple()] if len(df) else []
+    index = {k: i for i, k in enumerate(keys)}
+    for k in found:
+        if k not in index:
+            index[k] = len(keys)
+            keys.append(k)
+    remap = np.array([index[k] for k in found], dtype=np.int64)
+    keep = (local >= 0) & df[date_col].notna().to_numpy()
+    codes = remap[local[keep]] if len(remap) else local[keep]
+    sub = df[keep] if not keep.all() else df
+    real = np.float32 if compact else float
+    columns = {'date': sub[date_col].values.astype('datetime64[ns]', copy=False),
+               'target': sub[target_col].to_numpy(dtype=real, na_value=np.nan)}
+    if promo_col in sub.columns:
+        promo = sub[promo_col].to_numpy(dtype=float, na_value=np.nan)
+        columns['promo'] = np.where(np.isnan(promo), -1, promo).astype(np.int8) if compact else promo
+    if discount_col in sub.columns:
+        columns['discount'] = pd.to_numeric(sub[discount_col], errors='coerce').to_numpy(dtype=real)
+    names = list(event_names if event_names is not None else [])
+    if event_name_col in sub.columns:
+        ev_codes, uniques = pd.factorize(sub[event_name_col])
+        name_index = {n: i for i, n in enumerate(names)}
+        for n in uniques:
+            if n not in name_index:
+                name_index[n] = len(names)
+                names.append(n)
+        ev_remap = np.array([name_index[n] for n in uniques], dtype=np.int32)
+        columns['event'] = np.where(ev_codes >= 0, ev_remap[np.clip(ev_codes, 0, None)] if len(ev_remap) else -1, -1).astype(np.int32)
+    return keys, codes, columns, names
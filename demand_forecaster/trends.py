@@ -0,0 +1,25 @@
+import numpy as np
+
+# component name -> period table used for the period-over-period change
+TREND_LEVELS = (('weekly', 'W'), ('monthly', 'M'), ('yearly', 'Y'))
+
+def last_change(table):
+    """Relative change between the means of the last two periods of a table.
+    NaN when there are fewer than two periods or the earlier mean is 0/NaN.
+    """
+    sums, counts = table['sum'], table['count']
+    if len(sums) < 2:
+        return np.nan
+    prev = sums[-2] / counts[-2] if counts[-2] > 0 else np.nan
+    last = sums[-1] / counts[-1] if counts[-1] > 0 else np.nan
+    if prev == 0:
+        return np.nan
+    return float((last - prev) / prev)
+
+def trend_components(tables):
+    """Week-over-week, month-over-month and year-over-year components."""
+    return {name: last_change(tables[freq]) for name, freq in TREND_LEVELS}
+
+def trend_factor(components):
+    arr = [v for v in components.values() if not np.isnan(v)]
+    return 1.0 + float(np.mean(arr)) if arr else 1.0
@@ -1,12 +1,34 @@
 
+import hashlib
 import pandas as pd
 import numpy as np
 
-def ensure_datetime(df, col="date"):
-    df = df.copy()
+def ensure_datetime(df, col="date", copy=True):
+    # copy=False only copies the frame's column index: the other columns stay shared
+    df = df.copy() if copy else df.copy(deep=False)
     df[col] = pd.to_datetime(df[col])
     return df
 
+def compact_frame(df, categorical=(), float32=()):
+    """Shallow copy of `df` with the `categorical` columns as category and the
+    `float32` columns downcast (columns already in those dtypes are left alone)."""
+    out = df.copy(deep=False)
+    for c in categorical:
+        if c in out.columns and not isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype('category')
+    for c in float32:
+        if c in out.columns and out[c].dtype != np.float32:
+            out[c] = pd.to_numeric(out[c], errors='coerce').astype(np.float32)
+    return out
+
+def parse_memory(value):
+    """Bytes from an int or a size string such as '512M' or '8GB' (None stays None)."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    text = str(value).strip().upper().rstrip('B')
+    scale = {'K': 2**10, 'M': 2**20, 'G': 2**30, 'T': 2**40}.get(text[-1:], 1)
+    return int(float(text.rstrip('KMGT')) * scale)
+
 def week_of_month(dt, week_start='MON'):
     """Return 1-based index of the week within a month.
     Weeks are anchored to week_start (MON/TUE/.../SUN). Default MON.
@@ -58,30 +80,44 @@ def explode_events(events_df, attributes=None, lag_days=0):
     """
     if events_df is None or len(events_df) == 0:
         return pd.DataFrame(columns=['date','event_id','event_name'] + (attributes or []))
-    ev = events_df.copy()
-    ev['start_date'] = pd.to_datetime(ev['start_date'])
-    ev['end_date'] = pd.to_datetime(ev['end_date'])
-    out = []
-    for _, r in ev.iterrows():
-        if pd.isna(r['start_date']) or pd.isna(r['end_date']):
-            continue
-        d = r['start_date']
-        while d <= r['end_date']:
-            row = {'date': d + pd.Timedelta(days=lag_days),
-                   'event_id': r.get('event_id', None),
-                   'event_name': r.get('event_name', None)}
-            if attributes:
-                for a in attributes:
-                    if a in ev.columns:
-                        row[a] = r.get(a, None)
-            out.append(row)
-            d += pd.Timedelta(days=1)
+    start = pd.to_datetime(events_df['start_date'])
+    end = pd.to_datetime(events_df['end_date'])
+    # number of days d = start + k (k >= 0) with d <= end; 0 for missing or inverted ranges
+    lengths = ((end - start).dt.days + 1).fillna(0).clip(lower=0).to_numpy(dtype=np.int64)
+    if lengths.sum() == 0:
+        return pd.DataFrame()
+    idx = np.repeat(np.arange(len(events_df)), lengths)
+    offsets = np.arange(len(idx)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    out = {'date': pd.DatetimeIndex(start.to_numpy()[idx]) + pd.to_timedelta(offsets + lag_days, unit='D')}
+    for c in ['event_id', 'event_name']:
+        out[c] = events_df[c].to_numpy()[idx] if c in events_df.columns else None
+    for a in (attributes or []):
+        if a in events_df.columns:
+            out[a] = events_df[a].to_numpy()[idx]
     return pd.DataFrame(out)
 
-def safe_merge_events(sales_df, events_daily, attributes=None):
+def frame_fingerprint(df):
+    """Cheap content hash of a DataFrame (values, index and column names)."""
+    h = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(repr(list(df.columns)).encode())
+    return h.hexdigest()
+
+def safe_merge_events(sales_df, events_daily, attributes=None, copy=True):
+    """Left-join the daily events onto the sales rows. copy=False avoids copying the
+    sales frame: when every (date, attributes) key has at most one event, each row's
+    event columns are looked up and attached (as categoricals) to a shallow copy."""
     if events_daily is None or len(events_daily) == 0:
-        return sales_df.copy()
+        return sales_df.copy() if copy else sales_df
     on_cols = ['date']
     if attributes:
         on_cols += [a for a in attributes if a in events_daily.columns]
-    return sales_df.merge(events_daily, on=on_cols, how='left')
+    if copy or events_daily.duplicated(on_cols).any():
+        return sales_df.merge(events_daily, on=on_cols, how='left')
+    rows = pd.MultiIndex.from_frame(events_daily[on_cols]).get_indexer(pd.MultiIndex.from_frame(sales_df[on_cols]))
+    out = sales_df.copy(deep=False)
+    for c in events_daily.columns:
+        if c not in on_cols:
+            col = events_daily[c].astype('category')
+            codes = np.where(rows >= 0, col.cat.codes.to_numpy()[np.clip(rows, 0, None)], -1)
+            out[c] = pd.Categorical.from_codes(codes, dtype=col.dtype)
+    return out
@@ -0,0 +1,34 @@
+import os
+import pandas as pd
+import pytest
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+ATTRIBUTES = ['region', 'store', 'item']
+
+@pytest.fixture
+def sales():
+    return pd.read_csv(os.path.join(EXAMPLES, 'dummy_sales.csv'))
+
+@pytest.fixture
+def events():
+    return pd.read_csv(os.path.join(EXAMPLES, 'dummy_events.csv'))
+
+@pytest.fixture
+def plan():
+    return pd.read_csv(os.path.join(EXAMPLES, 'dummy_future_plan.csv'), parse_dates=['date'])
+
+# lookback_config the reference forecasts were made with
+LOOKBACK = {'default': {'D': 8, 'W': 6, 'M': 5}, ('West',): {'D': 4, 'W': 3, 'M': 2}}
+HORIZONS = {'D': 30, 'W': 10, 'M': 4}
+
+def make_model(freq='D', method='wma', **params):
+    from demand_forecaster import AttributeAwareForecaster
+    return AttributeAwareForecaster(method=method, attributes=ATTRIBUTES, horizon_freq=freq, lookback_config=LOOKBACK,
+                                    use_trends=True, use_promotions=True, use_events=True, **params)
+
+def assert_forecasts_equal(got, expected, exact=False):
+    # missing event names may come back as None or NaN
+    got, expected = (f.reset_index(drop=True).assign(event_name=lambda d: d['event_name'].fillna('').astype(str))
+                     for f in (got, expected))
+    pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False, check_exact=exact,
+                                  **({} if exact else {'rtol': 1e-9}))
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from demand_forecaster import AttributeAwareForecaster
+from demand_forecaster.utils import period_start
+from conftest import ATTRIBUTES
+
+# Wednesday mid-month cutoffs: W and M snap them back to their period start
+CUTOFFS = ['2025-04-16', '2025-05-01', '2025-06-11', '2025-07-01']
+PERIODS = {'D': 10, 'W': 4, 'M': 2}
+LOOKBACKS = (2, 4)
+
+def refit_errors(sales, freq, method, n):
+    """backtest() sums the slow way: refit on the history before each cutoff and forecast
+    from it, then score every forecast period that has actuals."""
+    period = sales['date'].dt.to_period({'D': 'D', 'W': 'W-SUN', 'M': 'M'}[freq]).dt.start_time
+    actual = sales.assign(date=period).groupby(ATTRIBUTES + ['date'], as_index=False)['sales'].sum()
+    errors = []
+    for cutoff in CUTOFFS:
+        model = AttributeAwareForecaster(method=method, attributes=ATTRIBUTES, horizon_freq=freq,
+                                         lookback_config={'default': {freq: n}}, use_trends=False,
+                                         use_promotions=False, use_events=False)
+        model.fit(sales[sales['date'] < period_start(cutoff, freq)])
+        f = model.forecast(horizon_start=cutoff, horizon_periods=PERIODS[freq])
+        m = f.merge(actual, on=ATTRIBUTES + ['date'])
+        errors.append(m[ATTRIBUTES].assign(e=m['forecast'] - m['sales'], a=m['sales']))
+    e = pd.concat(errors).groupby(ATTRIBUTES)
+    return pd.DataFrame({'n': e['e'].count(), 'abs_error': e['e'].agg(lambda x: x.abs().sum()),
+                         'error': e['e'].sum(), 'abs_actual': e['a'].agg(lambda x: x.abs().sum())}).reset_index()
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+def test_matches_refit_per_cutoff(sales, freq):
+    sales['date'] = pd.to_datetime(sales['date'])
+    model = AttributeAwareForecaster(attributes=ATTRIBUTES, horizon_freq=freq).fit(sales)
+    result = model.backtest(CUTOFFS, PERIODS[freq], lookbacks=LOOKBACKS, methods=('wma', 'median'))
+    assert len(result) == len(model._group_state) * 2 * len(LOOKBACKS)
+    for (method, n), got in result.groupby(['method', 'lookback']):
+        got = got.sort_values(ATTRIBUTES).reset_index(drop=True)
+        expected = refit_errors(sales, freq, method, n)
+        pd.testing.assert_frame_equal(got[ATTRIBUTES], expected[ATTRIBUTES])
+        assert (got['n'].to_numpy() == expected['n'].to_numpy()).all()
+        for c in ('abs_error', 'error', 'abs_actual'):
+            np.testing.assert_allclose(got[c].to_numpy(), expected[c].to_numpy(), rtol=1e-11, atol=1e-9)
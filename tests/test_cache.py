@@ -0,0 +1,24 @@
+import pandas as pd
+from demand_forecaster.cache import ForecastCache
+from conftest import make_model, assert_forecasts_equal
+
+def forecast(model, plan, events, cache=None):
+    return model.forecast(horizon_start='2025-08-21', horizon_periods=10, future_plan=plan, future_events=events, cache=cache)
+
+def test_cache_hits_equal_recompute(tmp_path, sales, events, plan):
+    expected = forecast(make_model('W').fit(sales, events), plan, events)
+    with ForecastCache(str(tmp_path / 'cache.db')) as cache:
+        cold = make_model('W').fit(sales, events, lazy=True)
+        assert_forecasts_equal(forecast(cold, plan, events, cache), expected, exact=True)
+        assert cold.cache_stats_['hits'] == 0
+        warm = make_model('W').fit(sales, events, lazy=True)
+        assert_forecasts_equal(forecast(warm, plan, events, cache), expected, exact=True)
+        assert warm.cache_stats_['misses'] == 0
+        # only the group whose history changed is recomputed
+        key = (sales['region'] == 'East') & (sales['store'] == 'S1') & (sales['item'] == 'Pizza')
+        changed = sales.copy()
+        changed.loc[key & (changed['date'] == changed['date'].max()), 'sales'] += 50
+        model = make_model('W').fit(changed, events, lazy=True)
+        got = forecast(model, plan, events, cache)
+        assert (model.cache_stats_['hits'], model.cache_stats_['misses']) == (7, 1)
+        assert_forecasts_equal(got, forecast(make_model('W').fit(changed, events), plan, events), exact=True)
@@ -0,0 +1,52 @@
+import sys
+import pandas as pd
+from demand_forecaster import AttributeAwareForecaster
+from demand_forecaster import cli
+from conftest import ATTRIBUTES
+
+def run_cli(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['forecast'] + [str(a) for a in args])
+    cli.main()
+
+def test_numeric_attribute_with_plan_and_events(tmp_path, monkeypatch, sales, events, plan):
+    # store ids as numbers: CSV sales attributes are read as text, the plan and events must match
+    sales['store'] = sales['store'].str[1:].astype(int)
+    plan['store'] = plan['store'].str[1:].astype(int)
+    sales.to_csv(tmp_path / 'sales.csv', index=False)
+    plan.to_csv(tmp_path / 'plan.csv', index=False)
+    events.to_csv(tmp_path / 'events.csv', index=False)
+    common = ['--horizon_freq', 'W', '--horizon_start', '2025-08-21', '--horizon_periods', 4,
+              '--use_promotions', '--use_events', '--future_plan', tmp_path / 'plan.csv', '--events', tmp_path / 'events.csv']
+    run_cli(monkeypatch, '--sales', tmp_path / 'sales.csv', '--attributes', *ATTRIBUTES, *common,
+            '--out', tmp_path / 'fit.csv', '--model_out', tmp_path / 'model')
+    run_cli(monkeypatch, '--model_in', tmp_path / 'model', *common, '--out', tmp_path / 'loaded.csv')
+
+    model = AttributeAwareForecaster(attributes=ATTRIBUTES, horizon_freq='W', use_trends=False, use_promotions=True, use_events=True)
+    expected = model.fit(sales, events).forecast(horizon_start='2025-08-21', horizon_periods=4, future_plan=plan,
+                                                 future_events=events)
+    for name in ('fit.csv', 'loaded.csv'):
+        got = pd.read_csv(tmp_path / name, parse_dates=['date'])
+        assert len(got) == len(expected)
+        pd.testing.assert_series_equal(got['store'], expected['store'].reset_index(drop=True), check_dtype=False)
+        pd.testing.assert_series_equal(got['forecast'], expected['forecast'].reset_index(drop=True), check_exact=False)
+        assert (got['promo_flag'] == expected['promo_flag'].to_numpy()).all()
+
+def test_shards_of_a_saved_model_merge_to_single_node_run(tmp_path, monkeypatch, sales, events, plan):
+    sales.to_csv(tmp_path / 'sales.csv', index=False)
+    plan.to_csv(tmp_path / 'plan.csv', index=False)
+    events.to_csv(tmp_path / 'events.csv', index=False)
+    common = ['--horizon_freq', 'W', '--horizon_start', '2025-08-21', '--horizon_periods', 4, '--use_trends',
+              '--use_promotions', '--use_events', '--future_plan', tmp_path / 'plan.csv', '--events', tmp_path / 'events.csv']
+    run_cli(monkeypatch, '--sales', tmp_path / 'sales.csv', '--attributes', *ATTRIBUTES, *common,
+            '--out', tmp_path / 'single.csv', '--model_out', tmp_path / 'model')
+    # every shard loads the model fitted on all sales
+    for k in range(3):
+        run_cli(monkeypatch, '--model_in', tmp_path / 'model', '--shard', f'{k}/3', *common, '--out', tmp_path / 'part{shard}.csv')
+    parts = [tmp_path / f'part{k}.csv' for k in range(3)]
+    sizes = [len(pd.read_csv(p)) for p in parts]
+    run_cli(monkeypatch, '--merge', *parts, '--attributes', *ATTRIBUTES, '--out', tmp_path / 'merged.csv')
+
+    single = pd.read_csv(tmp_path / 'single.csv')
+    merged = pd.read_csv(tmp_path / 'merged.csv')
+    assert sum(sizes) == len(single) and 0 < min(sizes)
+    pd.testing.assert_frame_equal(merged, single)
@@ -0,0 +1,66 @@
+import os
+import pandas as pd
+import pytest
+from conftest import EXAMPLES, HORIZONS, make_model, assert_forecasts_equal
+
+# forecasts of the original per-group pandas implementation on the example data
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'baseline_forecasts.csv')
+
+@pytest.fixture(scope='module')
+def baseline():
+    return pd.read_csv(BASELINE, parse_dates=['date'], keep_default_na=False, na_values={'event_name': ['']})
+
+@pytest.mark.parametrize('start', ['2025-06-10', '2025-08-21'])
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+@pytest.mark.parametrize('method', ['wma', 'median'])
+def test_matches_pandas_implementation(baseline, sales, events, plan, start, freq, method):
+    sales['date'] = pd.to_datetime(sales['date'])
+    expected = baseline[(baseline.case_start == start) & (baseline.case_freq == freq) & (baseline.case_method == method)]
+    expected = expected.drop(columns=['case_start', 'case_freq', 'case_method'])
+    got = make_model(freq, method).fit(sales, events).forecast(horizon_start=start, horizon_periods=HORIZONS[freq],
+                                                              future_plan=plan, future_events=events)
+    assert_forecasts_equal(got, expected)
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+def test_scenarios_match_forecast_per_plan(sales, events, plan, freq):
+    # one shared baseline pass, then a plan join per scenario: each equals a forecast() with that plan
+    model = make_model(freq).fit(sales, events)
+    deeper = plan.assign(promo_flag=1, discount=plan['discount'] + 0.1)
+    plans = {'none': None, 'plan': plan, 'deeper': deeper, 'empty': plan.iloc[:0]}
+    args = dict(horizon_start='2025-08-21', horizon_periods=HORIZONS[freq], future_events=events)
+    got = model.forecast_scenarios(plans=plans, **args)
+    assert list(got['scenario'].unique()) == list(plans)
+    for name, p in plans.items():
+        rows = got[got['scenario'] == name].drop(columns='scenario')
+        assert_forecasts_equal(rows, model.forecast(future_plan=p, **args), exact=True)
+    forecasts = [got.loc[got['scenario'] == name, 'forecast'].to_numpy() for name in ('none', 'deeper')]
+    assert (forecasts[0] != forecasts[1]).any()
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+def test_compact_matches_default(sales, events, plan, freq):
+    args = dict(horizon_start='2025-08-21', horizon_periods=HORIZONS[freq], future_plan=plan, future_events=events)
+    expected = make_model(freq).fit(sales, events).forecast(**args)
+    model = make_model(freq, compact=True).fit(sales, events)
+    columns = model._store.columns
+    assert columns['target'].dtype == 'float32' and columns['discount'].dtype == 'float32'
+    assert columns['promo'].dtype == 'int8'
+    got = model.forecast(**args).reset_index(drop=True)
+    # float32 sales: forecasts agree to float32 precision
+    pd.testing.assert_frame_equal(got.drop(columns=['forecast', 'trend_factor']), expected.drop(columns=['forecast', 'trend_factor']),
+                                  check_dtype=False, check_exact=True)
+    for c in ('forecast', 'trend_factor'):
+        pd.testing.assert_series_equal(got[c], expected[c].reset_index(drop=True), check_exact=False, rtol=1e-5)
+
+def test_plan_key_types_follow_the_store(sales, events, plan):
+    args = dict(horizon_start='2025-08-21', horizon_periods=HORIZONS['D'], future_events=events)
+    # int store ids in the history, text ones in the plan: the plan still applies
+    numeric = sales.assign(store=sales['store'].str[1:].astype(int))
+    model = make_model('D').fit(numeric, events)
+    expected = model.forecast(future_plan=plan.assign(store=plan['store'].str[1:].astype(int)), **args)
+    assert expected['promo_flag'].any()
+    assert_forecasts_equal(model.forecast(future_plan=plan.assign(store=plan['store'].str[1:]), **args), expected, exact=True)
+    # ids that don't convert (or int ids against text ones) match no group rather than failing the merge
+    assert_forecasts_equal(model.forecast(future_plan=plan, **args), model.forecast(**args), exact=True)
+    model = make_model('D').fit(sales, events)
+    assert_forecasts_equal(model.forecast(future_plan=plan.assign(store=plan['store'].str[1:].astype(int)), **args),
+                           model.forecast(**args), exact=True)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from demand_forecaster import HierarchicalForecaster
+from conftest import ATTRIBUTES, LOOKBACK, HORIZONS, make_model, assert_forecasts_equal
+
+def hierarchical(freq, reconcile=None):
+    return HierarchicalForecaster(ATTRIBUTES, reconcile=reconcile, method='wma', horizon_freq=freq, lookback_config=LOOKBACK,
+                                  use_trends=True, use_promotions=True, use_events=True)
+
+def level_rows(fcst, level):
+    return fcst[fcst['level'] == ','.join(level)].reset_index(drop=True)
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+def test_bottom_level_is_a_plain_fit(sales, events, plan, freq):
+    args = dict(horizon_start='2025-08-21', horizon_periods=HORIZONS[freq], future_plan=plan, future_events=events)
+    got = hierarchical(freq).fit(sales, events).forecast(**args)
+    assert sorted(got['level'].unique()) == ['region', 'region,store', 'region,store,item']
+    assert_forecasts_equal(level_rows(got, ATTRIBUTES), make_model(freq).fit(sales, events).forecast(**args))
+
+@pytest.mark.parametrize('reconcile', ['bottom_up', 'proportional'])
+def test_reconciled_levels_add_up(sales, events, plan, reconcile):
+    args = dict(horizon_start='2025-08-21', horizon_periods=HORIZONS['W'], future_plan=plan, future_events=events)
+    raw = hierarchical('W').fit(sales, events).forecast(**args)
+    got = hierarchical('W', reconcile).fit(sales, events).forecast(**args)
+    bottom = level_rows(got, ATTRIBUTES)
+    for i in (1, 2):
+        level = ATTRIBUTES[:i]
+        sums = bottom.groupby(level + ['date'], as_index=False)['forecast'].sum()
+        rows = level_rows(got, level)
+        np.testing.assert_allclose(rows['forecast'].to_numpy(), sums['forecast'].to_numpy(), rtol=1e-12)
+    if reconcile == 'bottom_up':
+        # the bottom forecasts are kept, parents are replaced by their sums
+        np.testing.assert_allclose(bottom['forecast'], level_rows(raw, ATTRIBUTES)['forecast'], rtol=1e-12)
+    else:
+        # the top level is kept and split over the bottom
+        top = ['region']
+        np.testing.assert_allclose(level_rows(got, top)['forecast'], level_rows(raw, top)['forecast'], rtol=1e-12)
@@ -0,0 +1,52 @@
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+from demand_forecaster import AttributeAwareForecaster
+from demand_forecaster.lookback import LookbackIndex, lookback_rules, read_lookback_rules
+from conftest import ATTRIBUTES
+
+# the shorter prefix comes first: a first-match scan would pick it for East/S1 groups
+CONFIG = {'default': {'D': 8, 'W': 6, 'M': 5},
+          ('East',): {'W': 4, 'M': 3},
+          ('East', 'S1'): {'W': 2},
+          ('East', 'S1', 'Pizza'): {'D': 5}}
+
+KEYS = [('East', 'S1', 'Pizza'), ('East', 'S1', 'Burger'), ('East', 'S2', 'Pizza'), ('West', 'S1', 'Pizza')]
+EXPECTED = [{'D': 5, 'W': 2, 'M': 3}, {'D': 8, 'W': 2, 'M': 3}, {'D': 8, 'W': 4, 'M': 3}, {'D': 8, 'W': 6, 'M': 5}]
+
+def test_longest_prefix_wins_per_frequency():
+    index = LookbackIndex(CONFIG)
+    assert [index.resolve(k) for k in KEYS] == EXPECTED
+    arrays = index.arrays(KEYS)
+    assert [{f: int(arrays[f][i]) for f in 'DWM'} for i in range(len(KEYS))] == EXPECTED
+
+def test_defaults():
+    assert LookbackIndex(None).resolve(('a',)) == {'D': 8, 'W': 6, 'M': 5}
+    # frequencies no entry sets fall back to 8; top-level frequencies are the default
+    assert LookbackIndex({'default': {'W': 6}}).resolve(('a',)) == {'D': 8, 'W': 6, 'M': 8}
+    assert LookbackIndex({'D': 3, 'W': 9}).resolve(('a',)) == {'D': 3, 'W': 9, 'M': 5}
+
+def test_model_uses_compiled_lookbacks(sales):
+    model = AttributeAwareForecaster(attributes=ATTRIBUTES, horizon_freq='W',
+                                    lookback_config=copy.deepcopy(CONFIG)).fit(sales)
+    assert [model._resolve_lookback(k) for k in KEYS] == EXPECTED
+    got = model.forecast(horizon_start='2025-08-21', horizon_periods=6)
+    for key, lookback in zip(KEYS, EXPECTED):
+        plain = AttributeAwareForecaster(attributes=ATTRIBUTES, horizon_freq='W', lookback_config={'default': lookback})
+        expected = plain.fit(sales).forecast(horizon_start='2025-08-21', horizon_periods=6)
+        rows = lambda f: f[(f[ATTRIBUTES] == key).all(axis=1)]['forecast'].to_numpy()
+        np.testing.assert_array_equal(rows(got), rows(expected))
+    # editing the config after fit is picked up
+    model.lookback_config[('West',)] = {'W': 2}
+    assert model._resolve_lookback(('West', 'S1', 'Pizza'))['W'] == 2
+
+def test_rule_table(tmp_path):
+    table = pd.DataFrame({'region': [None, 'East', 'East', 'East'], 'store': [None, None, 'S1', 'S1'],
+                          'item': [None, None, None, 'Pizza'], 'D': [8, None, None, 5], 'W': [6, 4, 2, None],
+                          'M': [5, 3, None, None]})
+    assert lookback_rules(table, ATTRIBUTES) == CONFIG
+    table.to_csv(tmp_path / 'rules.csv', index=False)
+    assert read_lookback_rules(tmp_path / 'rules.csv', ATTRIBUTES) == CONFIG
+    with pytest.raises(ValueError):
+        lookback_rules(pd.DataFrame({'region': [None], 'store': ['S1'], 'W': [3]}), ATTRIBUTES)
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+from demand_forecaster import parallel
+from conftest import HORIZONS, make_model, assert_forecasts_equal
+
+@pytest.fixture
+def fan_out(monkeypatch):
+    # the 8 example groups are far below the real threshold
+    monkeypatch.setattr(parallel, 'MIN_PARALLEL_GROUPS', 0)
+
+def test_small_runs_stay_serial():
+    model = make_model(n_jobs=4)
+    assert not parallel.fans_out(model, parallel.MIN_PARALLEL_GROUPS - 1)
+    assert parallel.fans_out(model, parallel.MIN_PARALLEL_GROUPS)
+    assert not parallel.fans_out(make_model(), 10 ** 6)
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+@pytest.mark.parametrize('params', [{}, {'max_memory': 20000}])
+def test_workers_match_serial(fan_out, sales, events, plan, freq, params):
+    serial = make_model(freq, **params).fit(sales, events)
+    model = make_model(freq, n_jobs=2, **params).fit(sales, events)
+    pd.testing.assert_frame_equal(model.lift_table_, serial.lift_table_, check_exact=True)
+    pd.testing.assert_frame_equal(model.trend_components_, serial.trend_components_, check_exact=True)
+    args = dict(horizon_start='2025-08-21', horizon_periods=HORIZONS[freq], future_plan=plan, future_events=events)
+    expected = serial.forecast(**args)
+    assert_forecasts_equal(model.forecast(**args), expected, exact=True)
+    assert_forecasts_equal(pd.concat(model.forecast_batches(batch_groups=3, **args)), expected, exact=True)
+    plans = {'base': None, 'plan': plan}
+    args.pop('future_plan')
+    pd.testing.assert_frame_equal(model.forecast_scenarios(plans=plans, **args),
+                                  serial.forecast_scenarios(plans=plans, **args), check_exact=True)
+    pd.testing.assert_frame_equal(model.backtest(['2025-06-01', '2025-07-01'], 2),
+                                  serial.backtest(['2025-06-01', '2025-07-01'], 2), check_exact=True)
+
+def test_lazy_fit_ships_without_history(fan_out, sales, events, plan, monkeypatch):
+    # spawn pickles the model handed to the workers: a lazy fit's states must not drag the store along
+    import multiprocessing
+    import pickle
+    pool, shipped = parallel.ProcessPoolExecutor, []
+    def spawn_pool(*args, initargs, **kwargs):
+        shipped.append(pickle.loads(pickle.dumps(initargs[0])))
+        return pool(*args, initargs=initargs, mp_context=multiprocessing.get_context('spawn'), **kwargs)
+    monkeypatch.setattr(parallel, 'ProcessPoolExecutor', spawn_pool)
+    args = dict(horizon_start='2025-08-21', horizon_periods=HORIZONS['W'], future_plan=plan, future_events=events)
+    expected = make_model('W').fit(sales, events).forecast(**args)
+    model = make_model('W', n_jobs=2).fit(sales, events, lazy=True)
+    assert_forecasts_equal(model.forecast(**args), expected, exact=True)
+    light = shipped[-1]
+    assert light._store is None and light._group_state._builder._store is None
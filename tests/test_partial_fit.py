@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+from conftest import HORIZONS, make_model, assert_forecasts_equal
+
+@pytest.mark.parametrize('freq', ['D', 'W', 'M'])
+def test_partial_fit_equals_refit(sales, events, plan, freq):
+    sales['date'] = pd.to_datetime(sales['date'])
+    old = sales[sales['date'] < '2025-07-15']
+    # a group only seen in the appended rows is added from scratch
+    old = old[~((old['store'] == 'S2') & (old['item'] == 'Pizza') & (old['region'] == 'West'))]
+    new = sales.drop(old.index)
+    appended = make_model(freq).fit(old, events)
+    for _, rows in new.groupby(new['date'].dt.to_period('W')):
+        appended.partial_fit(rows)
+    refit = make_model(freq).fit(sales, events)
+    args = dict(horizon_start='2025-08-21', horizon_periods=HORIZONS[freq], future_plan=plan, future_events=events)
+    assert_forecasts_equal(appended.forecast(**args), refit.forecast(**args))
+    pd.testing.assert_frame_equal(appended.lift_table_, refit.lift_table_, check_exact=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(appended.trend_components_, refit.trend_components_, check_exact=False, rtol=1e-9)
+
+def _split_last_days(days, history_days, n_groups=300):
+    from demand_forecaster.benchmarks import make_dataset
+    sales = make_dataset(n_groups, history_days, 7, 0.05, 10, seed=0)['sales']
+    sales['date'] = pd.to_datetime(sales['date'])
+    cut = sales['date'].max() - pd.Timedelta(days=days - 1)
+    return sales[sales['date'] < cut], sales[sales['date'] >= cut]
+
+def test_partial_fit_passes_only_see_new_rows():
+    old, new = _split_last_days(3, 120)
+    model = make_model('W', profile=True).fit(old)
+    before = model.profile_
+    model.partial_fit(new)
+    after = model.profile_
+    for stage in ('lifts', 'period_tables'):
+        assert after[stage]['rows'] - before[stage]['rows'] == len(new)
+
+def test_partial_fit_cost_follows_new_rows():
+    import time
+    def seconds(history_days):
+        # best of 3 (refit, partial_fit of the last day)
+        old, new = _split_last_days(1, history_days)
+        fit = append = float('inf')
+        for _ in range(3):
+            t0 = time.perf_counter()
+            model = make_model('W').fit(old)
+            t1 = time.perf_counter()
+            model.partial_fit(new)
+            t2 = time.perf_counter()
+            fit, append = min(fit, t1 - t0), min(append, t2 - t1)
+        return fit, append
+    short, long = seconds(365), seconds(1460)
+    # four times the history: a refit takes about three times as long, one more day barely longer
+    assert long[1] < 2 * short[1]
+    assert long[1] < long[0] / 2
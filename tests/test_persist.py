@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+from demand_forecaster import AttributeAwareForecaster
+from conftest import make_model, assert_forecasts_equal
+
+ARGS = dict(horizon_start='2025-08-21', horizon_periods=10)
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_load_round_trip(tmp_path, sales, events, plan, mmap):
+    model = make_model('W').fit(sales, events)
+    model.save(tmp_path / 'model')
+    loaded = AttributeAwareForecaster.load(tmp_path / 'model', mmap=mmap)
+    args = dict(ARGS, future_plan=plan, future_events=events)
+    assert_forecasts_equal(loaded.forecast(**args), model.forecast(**args), exact=True)
+    pd.testing.assert_frame_equal(loaded.lift_table_, model.lift_table_)
+    # other forecast-time settings apply to the saved tables
+    daily = AttributeAwareForecaster.load(tmp_path / 'model', mmap=mmap, horizon_freq='D', method='median')
+    expected = make_model('D', 'median').fit(sales, events)
+    assert_forecasts_equal(daily.forecast(**args), expected.forecast(**args), exact=True)
+
+def test_saved_model_keeps_appending(tmp_path, sales, events):
+    sales['date'] = pd.to_datetime(sales['date'])
+    old, new = sales[sales['date'] < '2025-08-01'], sales[sales['date'] >= '2025-08-01']
+    make_model('W').fit(old, events).save(tmp_path / 'model')
+    loaded = AttributeAwareForecaster.load(tmp_path / 'model').partial_fit(new)
+    refit = make_model('W').fit(old, events).partial_fit(new)
+    assert_forecasts_equal(loaded.forecast(**ARGS), refit.forecast(**ARGS), exact=True)
+
+def test_resave_does_not_change_mapped_model(tmp_path, sales, events):
+    sales['date'] = pd.to_datetime(sales['date'])
+    make_model('W').fit(sales, events).save(tmp_path / 'model')
+    mapped = AttributeAwareForecaster.load(tmp_path / 'model')
+    before = mapped.forecast(**ARGS)
+    make_model('W').fit(sales[sales['date'] < '2025-05-01'], events).save(tmp_path / 'model')
+    assert_forecasts_equal(mapped.forecast(**ARGS), before, exact=True)
+    reloaded = AttributeAwareForecaster.load(tmp_path / 'model')
+    assert not reloaded.forecast(**ARGS)['forecast'].equals(before['forecast'])
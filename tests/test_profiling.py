@@ -0,0 +1,39 @@
+from demand_forecaster import parallel
+from conftest import make_model
+
+def fit_calls(sales, events, **params):
+    calls = []
+    model = make_model('W', profile=lambda *m: calls.append(m), **params).fit(sales, events)
+    return model, calls
+
+def test_each_fit_stage_recorded_once(sales, events):
+    model, calls = fit_calls(sales, events)
+    report = model.profile_
+    assert report['lifts']['calls'] == 1 and report['period_tables']['calls'] == 1
+    assert report['lifts']['rows'] == len(sales)
+    assert [c[0] for c in calls].count('lifts') == 1
+
+def test_callback_sees_worker_stages(sales, events, monkeypatch):
+    monkeypatch.setattr(parallel, 'MIN_PARALLEL_GROUPS', 0)
+    runs = []
+    for n_jobs in (None, 2):
+        model, calls = fit_calls(sales, events, n_jobs=n_jobs)
+        model.forecast(horizon_start='2025-08-21', horizon_periods=4)
+        runs.append((model, calls))
+    (_, serial_calls), (model, calls) = runs
+    # per-group stages (forecast ones run in the workers) reach the callback once each
+    for stage in ('trend', 'baselines'):
+        groups = sorted(c[3] for c in calls if c[0] == stage)
+        assert groups == sorted(c[3] for c in serial_calls if c[0] == stage)
+        assert model.profile_[stage]['calls'] == len(groups) == 8
+
+def test_callback_stays_in_parent_under_spawn(sales, events, monkeypatch):
+    # spawn (macOS/Windows default) pickles what goes to the workers; the callback is a local lambda
+    import multiprocessing
+    from functools import partial
+    monkeypatch.setattr(parallel, 'MIN_PARALLEL_GROUPS', 0)
+    monkeypatch.setattr(parallel, 'ProcessPoolExecutor',
+                        partial(parallel.ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn')))
+    model, calls = fit_calls(sales, events, n_jobs=2)
+    model.forecast(horizon_start='2025-08-21', horizon_periods=4)
+    assert sorted(c[3] for c in calls if c[0] == 'baselines') == sorted(model._group_state)
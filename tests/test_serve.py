@@ -0,0 +1,98 @@
+import asyncio
+import pandas as pd
+import pytest
+from demand_forecaster import AttributeAwareForecaster
+from demand_forecaster.serve import ForecastService
+from conftest import ATTRIBUTES, LOOKBACK, make_model
+
+PARAMS = dict(horizon_freq='W', lookback_config=LOOKBACK, use_trends=True, use_promotions=True, use_events=True)
+HORIZON = {'horizon_start': '2025-08-21', 'horizon_periods': 4}
+
+@pytest.fixture
+def saved(tmp_path, sales, events):
+    make_model('W').fit(sales, events).save(tmp_path / 'model')
+    return str(tmp_path / 'model')
+
+def ask(service, *reqs):
+    # concurrent requests, as from separate connections; exceptions are returned, not raised
+    async def run():
+        return await asyncio.gather(*(service.forecast(r) for r in reqs), return_exceptions=True)
+    return asyncio.run(run())
+
+def expected(path, events, key, plan=None):
+    f = AttributeAwareForecaster.load(path, **PARAMS).forecast(future_plan=plan, future_events=events, **HORIZON)
+    return f[(f[ATTRIBUTES] == list(key)).all(axis=1)].reset_index(drop=True)
+
+def assert_response(res, exp):
+    got = pd.DataFrame(res['rows'], columns=res['columns'])
+    got['date'] = pd.to_datetime(got['date'])
+    exp = exp.assign(event_name=exp['event_name'].fillna('').astype(str))
+    got = got.assign(event_name=got['event_name'].fillna('').astype(str))
+    pd.testing.assert_frame_equal(got, exp[got.columns], check_dtype=False)
+
+def plan_rows(plan, key, **values):
+    rows = plan[(plan[ATTRIBUTES] == list(key)).all(axis=1)].assign(**values)
+    rows['date'] = rows['date'].dt.strftime('%Y-%m-%d')
+    return rows
+
+def test_concurrent_requests_share_a_batch(saved, events):
+    service = ForecastService(saved, PARAMS, future_events=events, batch_window=0.05)
+    batches, run_batch = [], service._run_batch
+    service._run_batch = lambda *args: batches.append(len(args[-1])) or run_batch(*args)
+    keys = list(service.model._store.keys)
+    results = ask(service, *({'groups': [list(k)], **HORIZON} for k in keys))
+    assert batches == [len(keys)]
+    for key, res in zip(keys, results):
+        assert_response(res, expected(saved, events, key))
+
+def test_each_request_gets_its_own_plan(saved, events, plan):
+    service = ForecastService(saved, PARAMS, future_events=events, batch_window=0.05)
+    keys = list(service.model._store.keys)
+    # the same group twice under different plans, plus a group without one
+    reqs = [{'groups': [list(keys[0])], 'plan': plan_rows(plan, keys[0]).to_dict('records'), **HORIZON},
+            {'groups': [list(keys[0])], 'plan': plan_rows(plan, keys[0], promo_flag=1, discount=0.2).to_dict('records'), **HORIZON},
+            {'groups': [list(keys[1])], **HORIZON}]
+    results = ask(service, *reqs)
+    for req, key, res in zip(reqs, [keys[0], keys[0], keys[1]], results):
+        own = pd.DataFrame(req['plan']).assign(date=lambda d: pd.to_datetime(d['date'])) if 'plan' in req else None
+        assert_response(res, expected(saved, events, key, own))
+    assert results[0]['rows'] != results[1]['rows']
+
+def test_unknown_group_fails_alone(saved, events):
+    service = ForecastService(saved, PARAMS, future_events=events, batch_window=0.05)
+    key = service.model._store.keys[0]
+    bad, good = ask(service, {'groups': [['x', 'y', 'z']], **HORIZON}, {'groups': [list(key)], **HORIZON})
+    assert isinstance(bad, ValueError) and 'Unknown group' in str(bad)
+    assert_response(good, expected(saved, events, key))
+
+def test_reload_swaps_model_and_drops_responses(tmp_path, saved, sales, events):
+    service = ForecastService(saved, PARAMS, future_events=events)
+    key = service.model._store.keys[0]
+    req = {'groups': [list(key)], **HORIZON}
+    other = str(tmp_path / 'other')
+    make_model('W').fit(sales[sales['date'] < '2025-06-01'], events).save(other)
+
+    async def ask_reload_ask():
+        before = await service.forecast(req)
+        cached = service.info()['cached_responses']
+        info = await service.reload(other)
+        return before, cached, info, await service.forecast(req)
+    before, cached, info, after = asyncio.run(ask_reload_ask())
+    assert cached == 1
+    assert info['version'] == 2 and info['model'] == other and info['cached_responses'] == 0
+    assert after['rows'] != before['rows']
+    assert_response(after, expected(other, events, key))
+
+def test_rounds_only_join_their_groups(saved, events):
+    # events are exploded once per loaded model; each round's grid covers only its groups
+    calls = []
+    service = ForecastService(saved, dict(PARAMS, profile=lambda *m: calls.append(m)), future_events=events)
+    keys = service.model._store.keys
+
+    async def two_rounds():
+        await asyncio.gather(service.forecast({'groups': [list(keys[0])], **HORIZON}),
+                             service.forecast({'groups': [list(keys[1]), list(keys[2])], **HORIZON}))
+        await service.forecast({'groups': [list(keys[3])], **HORIZON})
+    asyncio.run(two_rounds())
+    assert [c[0] for c in calls].count('explode_events') == 1
+    assert [c[2] for c in calls if c[0] == 'horizon_grid'] == [3 * 4, 1 * 4]